@@ -15,12 +15,14 @@ if [[ "$1" == "-h" ]] || [[ "$1" == "--help" ]]; then
     echo "  -o, --output FILE     Output Excel file (default: ocr_results.xlsx)"
     echo "  --files-dir DIR       Directory containing files (default: files)"
     echo "  --limit NUMBER        Limit number of files to process (for testing)"
+    echo "  --workers NUMBER      Number of files to process in parallel (default: 1)"
     echo "  -h, --help            Show this help message"
     echo ""
     echo "Examples:"
     echo "  $0                              # Process all files"
     echo "  $0 --limit 50                   # Process only first 50 files (testing)"
     echo "  $0 -o test_results.xlsx --limit 10  # Test with 10 files, custom output"
+    echo "  $0 --workers 4                  # Run up to 4 OCR requests at once"
     echo ""
     echo "Features:"
     echo "  ✅ Smart caching - reuses previous results to save API costs"
@@ -5,16 +5,49 @@ Processes all PDF files in 'files' directory and outputs to Excel
 """
 
 import os
-import sys
-import json
+import atexit
+import hashlib
 import argparse
-import subprocess
+import functools
+import shutil
 from pathlib import Path
 import pandas as pd
-from typing import List, Dict, Any
+try:
+    import xlsxwriter  # Faster Excel writer, used through pandas when installed
+except ImportError:
+    xlsxwriter = None
+from typing import List, Dict, Any, Tuple, NamedTuple
 from datetime import datetime
 import re
+import string
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from column_normalizer import ColumnNormalizer
+from json_io import load_json, dump_json
+import sample_analyze_read
+from extract_final_table import extract_final_table
+
+# Precompiled patterns used by the header/data heuristics below
+# Dates and dashed phone numbers, tried as a single alternation with .match()
+DATE_OR_PHONE_PATTERN = re.compile(
+    r'\d{1,2}/\d{1,2}/\d{2,4}'      # MM/DD/YYYY or DD/MM/YYYY
+    r'|\d{4}-\d{2}-\d{2}'           # YYYY-MM-DD
+    r'|\d{1,2}\.\d{1,2}\.\d{2,4}'   # DD.MM.YYYY
+    r'|\d{3}-\d{3}-\d{4}$'          # 123-456-7890
+)
+HEBREW_WORD_PATTERN = re.compile(r'[\u0590-\u05FF]+')
+SPACED_ID_PATTERN = re.compile(r'^\d{2,3}\s*\d{5,6}$')  # e.g., "255 87932"
+ISRAELI_ID_PATTERN = re.compile(r'^\d{9}$')  # e.g., "123456789"
+GENERIC_ID_PATTERN = re.compile(r'^\d{8,10}$')  # 8-10 digit IDs
+SELECTION_MARK_PATTERN = re.compile(r':(?:selected|unselected):')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+OCR_ARTIFACT_PATTERN = re.compile(r'V\(PINVIS|Nd DOIS|Good Neutral|:selected:|:unselected:')
+LETTER_PATTERN = re.compile(r'[\u0590-\u05FFa-zA-Z]')  # Hebrew or English letter
+EXCEL_COLUMN_NAMES = frozenset(string.ascii_uppercase)  # A-Z
+HEADER_INVALID_CHARS_PATTERN = re.compile(r'[^\w\u0590-\u05FF\s\.\-]')
+
+HEADER_WORDS = ['id', 'name', 'שם', 'ת.ז', 'תז', 'ת״ז', 'מספר', 'זהות', 'first', 'last', 'תפקיד', 'position']
 
 def is_likely_data(value):
     """Examine value to determine if it looks like data rather than a header"""
@@ -22,47 +55,69 @@ def is_likely_data(value):
         return False
     
     value_str = str(value).strip()
+    n = len(value_str)
     
-    # Check for date patterns (common data that becomes column headers)
-    if re.match(r'\d{1,2}/\d{1,2}/\d{2,4}', value_str):  # MM/DD/YYYY or DD/MM/YYYY
-        return True
-    if re.match(r'\d{4}-\d{2}-\d{2}', value_str):  # YYYY-MM-DD
-        return True
-    if re.match(r'\d{1,2}\.\d{1,2}\.\d{2,4}', value_str):  # DD.MM.YYYY
-        return True
-    
-    # Check for ID numbers (should not be column headers)
-    if re.match(r'^\d{7,12}$', value_str):  # 7-12 digit numbers (IDs)
+    # Check for very long text (more than 25 characters) - likely content
+    if n > 25:
         return True
     
-    # Check for phone numbers
-    if re.match(r'^\d{3}-\d{3}-\d{4}$', value_str) or re.match(r'^\d{10}$', value_str):
-        return True
+    # Short cells (most headers) can't match the patterns below, so each
+    # check is gated on the minimum length its pattern needs
     
-    # Check for multiple Hebrew/English names (like "ליאל גניש ואוהד שמח")
-    hebrew_words = re.findall(r'[\u0590-\u05FF]+', value_str)
-    if len(hebrew_words) >= 3:  # Multiple Hebrew names
+    # Check for date and phone number patterns (common data that becomes
+    # column headers)
+    if n >= 6 and DATE_OR_PHONE_PATTERN.match(value_str):
         return True
     
-    # Check for "ו" (Hebrew "and") which suggests multiple names
-    if 'ו' in value_str and len(hebrew_words) >= 2:
+    # Check for ID numbers (should not be column headers); this also covers
+    # 10 digit phone numbers
+    if 7 <= n <= 12 and value_str.isdecimal():
         return True
     
-    # Check for very long text (more than 25 characters) - likely content
-    if len(value_str) > 25:
-        return True
+    if n >= 3:
+        # Check for multiple Hebrew/English names (like "ליאל גניש ואוהד שמח")
+        hebrew_words = HEBREW_WORD_PATTERN.findall(value_str)
+        if len(hebrew_words) >= 3:  # Multiple Hebrew names
+            return True
+        
+        # Check for "ו" (Hebrew "and") which suggests multiple names
+        if 'ו' in value_str and len(hebrew_words) >= 2:
+            return True
     
     # Check for common data separators like "|" or "," with meaningful content
-    if ('|' in value_str or ',' in value_str) and len(value_str) > 8:
+    if n > 8 and ('|' in value_str or ',' in value_str):
         return True
     
     # Check for common OCR artifacts that are clearly not headers
-    ocr_artifacts = ['V(PINVIS', 'Nd DOIS', 'Good Neutral', ':selected:', ':unselected:']
-    if any(artifact in value_str for artifact in ocr_artifacts):
+    if n >= 7 and OCR_ARTIFACT_PATTERN.search(value_str):
         return True
     
     return False
 
+def is_id_like(value):
+    """Check if a value looks like an ID"""
+    if not value:
+        return False
+    val_str = str(value).strip()
+    # Check for Israeli ID patterns (9 digits with optional spaces/separators)
+    if SPACED_ID_PATTERN.match(val_str):  # e.g., "255 87932"
+        return True
+    if ISRAELI_ID_PATTERN.match(val_str):  # e.g., "123456789"
+        return True
+    if GENERIC_ID_PATTERN.match(val_str):  # 8-10 digit IDs
+        return True
+    return False
+
+def has_header_like_content(row):
+    """Check if a row contains header-like content"""
+    for val in row:
+        if val:
+            val_str = str(val).strip().lower()
+            for word in HEADER_WORDS:
+                if word in val_str:
+                    return True
+    return False
+
 def clean_and_normalize_headers(headers):
     """Logic for filtering and normalizing headers by excluding likely data rows"""
     valid_headers = []
@@ -75,80 +130,93 @@ def clean_and_normalize_headers(headers):
             # Clean and normalize valid header
             header_str = str(header).strip()
             
-            # Remove common OCR artifacts from valid headers
-            header_str = re.sub(r':selected:', '', header_str)
-            header_str = re.sub(r':unselected:', '', header_str)
-            header_str = re.sub(r'\n+', ' ', header_str)
-            header_str = re.sub(r'\s+', ' ', header_str)
-            header_str = header_str.strip()
+            # Remove common OCR artifacts from valid headers, then collapse
+            # newlines and repeated whitespace in one pass
+            header_str = SELECTION_MARK_PATTERN.sub('', header_str)
+            header_str = WHITESPACE_PATTERN.sub(' ', header_str).strip()
             
             valid_headers.append(header_str if header_str else '')
     
     return valid_headers
 
-def find_folders_in_directory(directory: str) -> List[Path]:
-    """Find all folders in the given directory"""
+@functools.lru_cache(maxsize=1024)
+def cached_normalized_headers(headers: Tuple) -> Tuple[str, ...]:
+    """clean_and_normalize_headers memoized per distinct header row, since
+    documents with the same layout repeat the same headers"""
+    return tuple(clean_and_normalize_headers(headers))
+
+def walk_supported_files(root: Path, file_stats: Dict[Path, os.stat_result] = None):
+    """Yield supported files under root using os.scandir, which reuses the
+    file type reported by the directory listing instead of stat'ing each path.
+    If file_stats is given, each file's stat result is recorded in it."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    file_path = Path(entry.path)
+                    if is_supported_file(file_path):
+                        if file_stats is not None:
+                            file_stats[file_path] = entry.stat()
+                        yield file_path
+
+def find_folders_in_directory(directory: str,
+                              file_stats: Dict[Path, os.stat_result] = None) -> List[Tuple[Path, List[Path]]]:
+    """Find all folders in the given directory, with the supported files under each.
+    
+    The tree is walked once; the root directory is listed (with every file in
+    the tree) only if it directly contains supported files.
+    """
     base_path = Path(directory)
+    all_files = sorted(walk_supported_files(base_path, file_stats))
+    
+    root_files = []
+    subfolder_files = {}
+    for file_path in all_files:
+        parts = file_path.relative_to(base_path).parts
+        if len(parts) == 1:
+            root_files.append(file_path)
+        else:
+            subfolder_files.setdefault(base_path / parts[0], []).append(file_path)
+    
     folders = []
     
     # Add root directory if it contains files
-    root_files = [f for f in base_path.iterdir() if f.is_file() and is_supported_file(f)]
     if root_files:
-        folders.append(base_path)
+        folders.append((base_path, all_files))
     
     # Add subdirectories that contain supported files
-    for item in base_path.iterdir():
-        if item.is_dir():
-            # Check if this folder or any subfolder contains supported files
-            supported_files = list(item.rglob('*'))
-            supported_files = [f for f in supported_files if f.is_file() and is_supported_file(f)]
-            if supported_files:
-                folders.append(item)
+    folders.extend(subfolder_files.items())
     
     return sorted(folders)
 
+SUPPORTED_EXTENSIONS = frozenset({
+    '.pdf', '.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif',
+    '.html', '.htm', '.docx', '.pptx', '.xlsx'
+})
+
+# Names to skip: system files (leading . or ~), error files (including
+# "_error.txt" and "___all_errors"), temp files, backups and copies
+EXCLUDED_NAME_PATTERN = re.compile(r'^[.~]|error|temp|tmp|backup|copy')
+
 def is_supported_file(file_path: Path) -> bool:
     """Check if file is supported by Azure Document Intelligence"""
-    supported_extensions = {
-        '.pdf', '.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif',
-        '.html', '.htm', '.docx', '.pptx', '.xlsx'
-    }
-    
     # Check file extension
-    if file_path.suffix.lower() not in supported_extensions:
+    if file_path.suffix.lower() not in SUPPORTED_EXTENSIONS:
         return False
     
     # Exclude error files and obvious junk
-    filename = file_path.name.lower()
-    
-    # Skip error files
-    if '_error.txt' in filename or 'error' in filename:
-        return False
-    
-    # Skip system files
-    if filename.startswith('.') or filename.startswith('~'):
-        return False
-    
-    # Skip temp files
-    if 'temp' in filename or 'tmp' in filename:
-        return False
-    
-    # Skip files that are clearly not documents
-    if any(skip in filename for skip in ['___all_errors', 'backup', 'copy']):
-        return False
-    
-    return True
+    return EXCLUDED_NAME_PATTERN.search(file_path.name.lower()) is None
 
-def find_files_in_folders(folders: List[Path]) -> List[Path]:
-    """Find all supported files in the selected folders"""
-    all_files = []
-    for folder in folders:
-        for file_path in folder.rglob('*'):
-            if file_path.is_file() and is_supported_file(file_path):
-                all_files.append(file_path)
-    return sorted(all_files)
+def find_files_in_folders(folders: List[Tuple[Path, List[Path]]]) -> List[Path]:
+    """Collect the supported files of the selected folders"""
+    return sorted(set(f for _, files in folders for f in files))
 
-def display_folders_for_selection(folders: List[Path], base_dir: Path) -> List[Path]:
+def display_folders_for_selection(folders: List[Tuple[Path, List[Path]]],
+                                  base_dir: Path) -> List[Tuple[Path, List[Path]]]:
     """Display folders and let user select which ones to process"""
     if not folders:
         print("No folders with supported files found in directory.")
@@ -157,13 +225,9 @@ def display_folders_for_selection(folders: List[Path], base_dir: Path) -> List[P
     print("\nFound folders with supported files:")
     print("=" * 60)
     
-    for i, folder_path in enumerate(folders, 1):
+    for i, (folder_path, files) in enumerate(folders, 1):
         rel_path = folder_path.relative_to(base_dir.parent) if folder_path != base_dir else folder_path.name
-        
-        # Count files in this folder
-        file_count = len([f for f in folder_path.rglob('*') if f.is_file() and is_supported_file(f)])
-        
-        print(f"{i:2d}. {rel_path} ({file_count} files)")
+        print(f"{i:2d}. {rel_path} ({len(files)} files)")
     
     print("\nSelection options:")
     print("- Enter specific numbers (e.g., 1,3,5)")
@@ -201,9 +265,16 @@ def display_folders_for_selection(folders: List[Path], base_dir: Path) -> List[P
         print("Invalid selection format. Please try again.")
         return []
     
-    return list(set(selected_folders))  # Remove duplicates
+    return list(dict(selected_folders).items())  # Remove duplicates, keeping selection order
+
+class ResultFolders(NamedTuple):
+    json_folder: Path
+    txt_folder: Path
+    excel_folder: Path
+    temp_folder: Path
+    error_folder: Path
 
-def create_result_folders():
+def create_result_folders() -> ResultFolders:
     """Create result folders if they don't exist"""
     json_folder = Path("json_result")
     txt_folder = Path("txt_result")
@@ -217,21 +288,87 @@ def create_result_folders():
     temp_folder.mkdir(exist_ok=True)
     error_folder.mkdir(exist_ok=True)
     
-    return json_folder, txt_folder, excel_folder, temp_folder, error_folder
+    return ResultFolders(json_folder, txt_folder, excel_folder, temp_folder, error_folder)
 
-def get_file_hash(file_path):
-    """Generate a hash for the file to create unique identifier"""
-    import hashlib
-    hasher = hashlib.md5()
+# Persistent map of (device, inode, mtime, size) -> MD5, so unchanged files
+# are not re-read on every run
+HASH_CACHE_FILE = Path(".hash_cache.json")
+MAX_HASH_CACHE_ENTRIES = 20000  # Least recently used entries are dropped beyond this
+_hash_cache = None
+_hash_cache_lock = threading.Lock()
+
+def load_hash_cache() -> Dict[str, str]:
+    """Load the file hash cache from disk"""
+    try:
+        return load_json(HASH_CACHE_FILE)
+    except (OSError, ValueError):
+        return {}
+
+def save_hash_cache():
+    """Write the file hash cache back to disk
+    
+    Entries are kept in least-to-most recently used order, so keys left behind by
+    edited, touched or re-copied files age out once the cache is full. The file is
+    written under a temporary name and renamed, so an interrupted write can't
+    leave a truncated cache.
+    """
+    with _hash_cache_lock:
+        if not _hash_cache:
+            return
+        entries = dict(list(_hash_cache.items())[-MAX_HASH_CACHE_ENTRIES:])
+        temp_file = HASH_CACHE_FILE.with_name(HASH_CACHE_FILE.name + '.tmp')
+        try:
+            dump_json(entries, temp_file, indent=False)
+            os.replace(temp_file, HASH_CACHE_FILE)
+        except OSError as e:
+            print(f"⚠️  Could not save hash cache: {e}")
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def md5_file(file_path):
+    """MD5 hex digest of a file's full contents"""
     with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096), b""):
+        if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+            return hashlib.file_digest(f, 'md5').hexdigest()
+        hasher = hashlib.md5()
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
             hasher.update(chunk)
-    return hasher.hexdigest()
+        return hasher.hexdigest()
 
-def check_cached_results(file_path: Path, json_folder: Path, txt_folder: Path):
+def get_file_hash(file_path, stat_result=None):
+    """Generate a hash for the file to create unique identifier"""
+    global _hash_cache
+    
+    st = stat_result if stat_result is not None else os.stat(file_path)
+    if st.st_ino == 0:
+        # os.DirEntry.stat() leaves st_ino and st_dev at 0 on Windows; os.stat fills them
+        st = os.stat(file_path)
+    if st.st_ino == 0:
+        # No file identity to key the memo on (same-size files with the same mtime
+        # would share an entry), so always hash
+        return md5_file(file_path)
+    key = f"{st.st_dev}:{st.st_ino}:{st.st_mtime_ns}:{st.st_size}"
+    
+    with _hash_cache_lock:
+        if _hash_cache is None:
+            _hash_cache = load_hash_cache()
+            atexit.register(save_hash_cache)
+        cached_hash = _hash_cache.pop(key, None)
+        if cached_hash:
+            _hash_cache[key] = cached_hash  # Re-inserted as the most recently used
+    if cached_hash:
+        return cached_hash
+    
+    file_hash = md5_file(file_path)
+    
+    with _hash_cache_lock:
+        _hash_cache[key] = file_hash
+    return file_hash
+
+def check_cached_results(file_path: Path, json_folder: Path, txt_folder: Path, stat_result=None):
     """Check if we already have cached results for this file"""
     base_name = file_path.stem
-    file_hash = get_file_hash(file_path)
+    file_hash = get_file_hash(file_path, stat_result)
     hash_suffix = file_hash[:8]
     
     # First check temp_results directory with simple naming
@@ -259,7 +396,21 @@ def check_cached_results(file_path: Path, json_folder: Path, txt_folder: Path):
     
     return None, None, None, file_hash
 
-def move_error_file(file_path: Path, error_folder: Path, error_message: str):
+@functools.lru_cache(maxsize=4096)
+def load_cached_final_table(path: str, mtime_ns: int):
+    """Load a cached final table JSON; mtime_ns is part of the cache key so
+    rewritten files are reloaded. The result is shared, so do not mutate it."""
+    return load_json(path)
+
+def link_or_copy(src: Path, dst: Path):
+    """Hard-link src to dst, copying instead when linking isn't possible
+    (different filesystem, dst already exists, no link support)"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+def move_error_file(file_path: Path, error_folder: Path, error_message: str, log=print):
     """Move a problematic file to the error_files directory"""
     try:
         # Create target path in error_files directory
@@ -275,7 +426,6 @@ def move_error_file(file_path: Path, error_folder: Path, error_message: str):
             counter += 1
         
         # Move the file
-        import shutil
         shutil.move(str(file_path), str(error_file_path))
         
         # Create an error log file alongside the moved file
@@ -286,13 +436,13 @@ def move_error_file(file_path: Path, error_folder: Path, error_message: str):
             f.write(f"Moved on: {datetime.now().isoformat()}\n")
             f.write(f"Original path: {file_path}\n")
         
-        print(f"  📁 Moved problematic file to: {error_file_path}")
-        print(f"  📝 Created error log: {error_log_path.name}")
+        log(f"  📁 Moved problematic file to: {error_file_path}")
+        log(f"  📝 Created error log: {error_log_path.name}")
         
         return True
         
     except Exception as e:
-        print(f"  ⚠️  Failed to move error file {file_path.name}: {e}")
+        log(f"  ⚠️  Failed to move error file {file_path.name}: {e}")
         return False
 
 def should_move_to_error_files(error_message: str) -> bool:
@@ -319,42 +469,52 @@ def should_move_to_error_files(error_message: str) -> bool:
     
     return False
 
-def process_single_file(file_path: Path) -> Dict[str, Any]:
-    """Process a single file and return extracted data with caching support"""
-    print(f"Processing: {file_path.name}")
+def process_single_file(file_path: Path, folders: ResultFolders, stat_result=None, log=print) -> Dict[str, Any]:
+    """Process a single file and return extracted data with caching support.
+    
+    stat_result may be passed from the directory scan to avoid stat'ing the
+    file again. Progress messages go to log (one string per call).
+    """
+    log(f"Processing: {file_path.name}")
     
     # Additional validation
-    if not file_path.exists():
-        return {'filename': file_path.name, 'error': 'File does not exist'}
+    if stat_result is None:
+        try:
+            stat_result = file_path.stat()
+        except FileNotFoundError:
+            return {'filename': file_path.name, 'error': 'File does not exist'}
     
     # Check file size (skip very large files that might cause issues)
-    file_size_mb = file_path.stat().st_size / (1024 * 1024)
+    file_size_mb = stat_result.st_size / (1024 * 1024)
     if file_size_mb > 100:  # 100 MB limit
-        print(f"Skipping {file_path.name} - file too large ({file_size_mb:.1f} MB)")
+        log(f"Skipping {file_path.name} - file too large ({file_size_mb:.1f} MB)")
         return {'filename': file_path.name, 'error': f'File too large ({file_size_mb:.1f} MB)'}
     
-    # Create result folders
-    json_folder, txt_folder, excel_folder, temp_folder, error_folder = create_result_folders()
+    json_folder, txt_folder, excel_folder, temp_folder, error_folder = folders
     
-    # Check for cached results first
-    cached_json, cached_txt, cached_final, file_hash = check_cached_results(file_path, json_folder, txt_folder)
+    # Check for cached results first (the file may have been removed since the
+    # directory scan that supplied stat_result)
+    try:
+        cached_json, cached_txt, cached_final, file_hash = check_cached_results(
+            file_path, json_folder, txt_folder, stat_result)
+    except FileNotFoundError:
+        return {'filename': file_path.name, 'error': 'File does not exist'}
     
     base_name = file_path.stem
     hash_suffix = file_hash[:8]
     
     if cached_json and cached_txt:
-        print(f"  ✅ Using cached results (hash: {hash_suffix})")
+        log(f"  ✅ Using cached results (hash: {hash_suffix})")
         
         # Check if we have a cached final table as well
         if cached_final and cached_final.exists():
             try:
-                with open(cached_final, 'r', encoding='utf-8') as f:
-                    table_data = json.load(f)
+                table_data = load_cached_final_table(str(cached_final), cached_final.stat().st_mtime_ns)
                 
                 # Check if this is a "no table data" cache entry
                 if (len(table_data) == 1 and 
                     table_data[0].get('metadata', {}).get('no_table_data', False)):
-                    print(f"  📋 Using cached 'no table' result (hash: {hash_suffix})")
+                    log(f"  📋 Using cached 'no table' result (hash: {hash_suffix})")
                     return {
                         'filename': file_path.name,
                         'error': 'No table data extracted',
@@ -368,12 +528,11 @@ def process_single_file(file_path: Path) -> Dict[str, Any]:
                     'cached': True
                 }
             except Exception as e:
-                print(f"  ⚠️  Error reading cached final table, will reprocess: {e}")
+                log(f"  ⚠️  Error reading cached final table, will reprocess: {e}")
         
         # Load and process cached table data directly
         try:
-            with open(cached_json, 'r', encoding='utf-8') as f:
-                cached_table_data = json.load(f)
+            cached_table_data = load_json(cached_json)
             
             # Check if this is temp_results format (direct array) or old format (nested)
             if isinstance(cached_table_data, list) and len(cached_table_data) > 0:
@@ -382,18 +541,21 @@ def process_single_file(file_path: Path) -> Dict[str, Any]:
                     # Convert temp_results format to final table format
                     final_table_data = []
                     for table in cached_table_data:
-                        rows = []
-                        max_row = max(cell['row_index'] for cell in table['cells']) + 1
-                        max_col = max(cell['column_index'] for cell in table['cells']) + 1
-                        
-                        # Create empty grid
-                        grid = [[''] * max_col for _ in range(max_row)]
-                        
-                        # Fill grid with cell content
+                        # Collect cell content and the grid size in one pass
+                        contents = {}
+                        max_row = max_col = 0
                         for cell in table['cells']:
                             row_idx = cell['row_index']
                             col_idx = cell['column_index']
-                            content = cell.get('content', '').strip()
+                            contents[row_idx, col_idx] = cell.get('content', '').strip()
+                            if row_idx >= max_row:
+                                max_row = row_idx + 1
+                            if col_idx >= max_col:
+                                max_col = col_idx + 1
+                        
+                        # Create the grid and fill it with cell content
+                        grid = [[''] * max_col for _ in range(max_row)]
+                        for (row_idx, col_idx), content in contents.items():
                             grid[row_idx][col_idx] = content
                         
                         # Convert grid to rows
@@ -423,7 +585,7 @@ def process_single_file(file_path: Path) -> Dict[str, Any]:
             
             else:
                 # Empty or "no tables" result
-                print(f"  📋 Using cached 'no table' result (hash: {hash_suffix})")
+                log(f"  📋 Using cached 'no table' result (hash: {hash_suffix})")
                 return {
                     'filename': file_path.name,
                     'error': 'No table data extracted',
@@ -431,60 +593,35 @@ def process_single_file(file_path: Path) -> Dict[str, Any]:
                 }
                 
         except Exception as e:
-            print(f"  ⚠️  Error reading cached table data: {e}")
+            log(f"  ⚠️  Error reading cached table data: {e}")
             # Fall back to normal processing
             pass
         
         # Copy cached files to temp directory for processing (fallback)
-        import shutil
         current_json = temp_folder / f"{base_name}_tables.json"
         current_txt = temp_folder / f"{base_name}_ocr_results.txt"
         
         if not cached_json.name.startswith(base_name):
             # Copy from temp_results to standard location
             if cached_json.exists():
-                shutil.copy2(cached_json, current_json)
+                link_or_copy(cached_json, current_json)
             if cached_txt and cached_txt.exists():
-                shutil.copy2(cached_txt, current_txt)
+                link_or_copy(cached_txt, current_txt)
         
     else:
-        print(f"  🔄 Running OCR analysis (hash: {hash_suffix})")
+        log(f"  🔄 Running OCR analysis (hash: {hash_suffix})")
         
         # Run OCR on the file
-        cmd = [sys.executable, 'sample_analyze_read.py', str(file_path), '--json']
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-            if result.returncode != 0:
-                error_msg = result.stderr.strip() if result.stderr else "Unknown error"
-                # Extract the actual error message, skip SSL warnings
-                error_lines = [line for line in error_msg.split('\n') if line.strip() and not line.startswith('  warnings.warn')]
-                if error_lines:
-                    # Get the last meaningful error line
-                    actual_error = error_lines[-1] if error_lines else error_msg
-                else:
-                    actual_error = "Process failed without specific error message"
-                
-                print(f"  ❌ Error processing {file_path.name}: {actual_error}")
-                
-                # Check if this error type should cause the file to be moved to error_files
-                if should_move_to_error_files(actual_error):
-                    print(f"  🚨 Moving problematic file due to error: {actual_error}")
-                    moved = move_error_file(file_path, error_folder, actual_error)
-                    if moved:
-                        return {
-                            'filename': file_path.name, 
-                            'error': f'File moved to error_files: {actual_error}',
-                            'moved_to_error_files': True
-                        }
-                
-                return {'filename': file_path.name, 'error': actual_error}
-        except subprocess.TimeoutExpired:
+            sample_analyze_read.run(str(file_path), save_json=True, verbose=False,
+                                    timeout=300, file_hash=file_hash)
+        except TimeoutError:
             timeout_error = 'Processing timeout (exceeded 5 minutes)'
-            print(f"  ⏰ Timeout processing {file_path.name}")
+            log(f"  ⏰ Timeout processing {file_path.name}")
             
             # Move timeout files to error_files as they often indicate problematic files
-            print(f"  🚨 Moving timeout file to error_files")
-            moved = move_error_file(file_path, error_folder, timeout_error)
+            log(f"  🚨 Moving timeout file to error_files")
+            moved = move_error_file(file_path, error_folder, timeout_error, log)
             if moved:
                 return {
                     'filename': file_path.name, 
@@ -494,47 +631,50 @@ def process_single_file(file_path: Path) -> Dict[str, Any]:
             
             return {'filename': file_path.name, 'error': timeout_error}
         except Exception as e:
-            unexpected_error = f'Unexpected error: {str(e)}'
-            print(f"  ❌ Unexpected error processing {file_path.name}: {str(e)}")
+            # Same "Type: message" form as the last line of a traceback
+            actual_error = f"{type(e).__name__}: {e}"
+            log(f"  ❌ Error processing {file_path.name}: {actual_error}")
             
-            # Check if this is a serious error that should move the file
-            serious_errors = ['permission denied', 'file not found', 'access denied', 'corrupt', 'invalid']
-            if any(serious in str(e).lower() for serious in serious_errors):
-                print(f"  🚨 Moving problematic file due to serious error")
-                moved = move_error_file(file_path, error_folder, unexpected_error)
+            # Check if this error type should cause the file to be moved to error_files
+            if should_move_to_error_files(actual_error):
+                log(f"  🚨 Moving problematic file due to error: {actual_error}")
+                moved = move_error_file(file_path, error_folder, actual_error, log)
                 if moved:
                     return {
                         'filename': file_path.name, 
-                        'error': f'File moved to error_files: {unexpected_error}',
+                        'error': f'File moved to error_files: {actual_error}',
                         'moved_to_error_files': True
                     }
             
-            return {'filename': file_path.name, 'error': unexpected_error}
+            return {'filename': file_path.name, 'error': actual_error}
     
     # Extract table data (files are created in current directory, but we'll move them to temp)
     json_file = Path(f"{base_name}_tables.json")
     final_json = Path(f"{base_name}_final_table.json")
+    table_data = None
     
     if json_file.exists():
-        cmd = [sys.executable, 'extract_final_table.py', str(json_file), '--cleanup']
         try:
-            subprocess.run(cmd, check=True, capture_output=True)
-        except subprocess.CalledProcessError as e:
-            print(f"  ❌ Error extracting table from {file_path.name}: {e}")
+            extracted = extract_final_table(str(json_file), cleanup=True, verbose=False)
+        except Exception as e:
+            log(f"  ❌ Error extracting table from {file_path.name}: {e}")
             return {'filename': file_path.name, 'error': f'Table extraction failed: {e}'}
+        if extracted is None:
+            log(f"  ❌ Error extracting table from {file_path.name}: no table produced")
+            return {'filename': file_path.name, 'error': 'Table extraction failed: no table produced'}
+        
+        # The extractor returns the same table it writes to final_json
+        _, final_result = extracted
+        table_data = [final_result]
     
-    # Read the final table data
-    if final_json.exists():
+    if table_data is not None:
         try:
-            with open(final_json, 'r', encoding='utf-8') as f:
-                table_data = json.load(f)
-            
-            # Save final table to cache if not from cache
+            # Save final table to cache if not from cache (a rename, so the
+            # file is neither re-read nor copied)
             if not (cached_json and cached_txt):
                 cached_final_name = f"{base_name}-{hash_suffix}_final_table.json"
-                import shutil
-                shutil.copy2(final_json, json_folder / cached_final_name)
-                print(f"  💾 Cached final table: {cached_final_name}")
+                os.replace(final_json, json_folder / cached_final_name)
+                log(f"  💾 Cached final table: {cached_final_name}")
             
             # Clean up temporary files
             ocr_results_file = Path(f"{base_name}_ocr_results.txt")
@@ -549,15 +689,13 @@ def process_single_file(file_path: Path) -> Dict[str, Any]:
                 'cached': cached_json and cached_txt
             }
         except Exception as e:
-            print(f"  ❌ Error reading table data from {file_path.name}: {e}")
-            return {'filename': file_path.name, 'error': f'Failed to read table data: {e}'}
+            log(f"  ❌ Error caching table data from {file_path.name}: {e}")
+            return {'filename': file_path.name, 'error': f'Failed to cache table data: {e}'}
     else:
-        print(f"  ⚠️  No table data found for {file_path.name}")
+        log(f"  ⚠️  No table data found for {file_path.name}")
         
         # Cache the "no table data" result to avoid future API calls
         if not (cached_json and cached_txt):
-            import shutil
-            
             # Cache the OCR results (both JSON and TXT) so cache detection works
             try:
                 ocr_results_file = Path(f"{base_name}_ocr_results.txt")
@@ -565,18 +703,17 @@ def process_single_file(file_path: Path) -> Dict[str, Any]:
                 # Cache the JSON file if it exists (even if no tables)
                 if json_file.exists():
                     cached_json_name = f"{base_name}-{hash_suffix}_tables.json"
-                    shutil.copy2(json_file, json_folder / cached_json_name)
+                    link_or_copy(json_file, json_folder / cached_json_name)
                 else:
                     # Create an empty tables file so cache detection works next time
                     cached_json_name = f"{base_name}-{hash_suffix}_tables.json"
                     empty_tables = {"tables": [], "no_tables_detected": True}
-                    with open(json_folder / cached_json_name, 'w', encoding='utf-8') as f:
-                        json.dump(empty_tables, f, ensure_ascii=False, indent=2)
+                    dump_json(empty_tables, json_folder / cached_json_name)
                 
                 # Cache the TXT file if it exists
                 if ocr_results_file.exists():
                     cached_txt_name = f"{base_name}-{hash_suffix}_ocr_results.txt"
-                    shutil.copy2(ocr_results_file, txt_folder / cached_txt_name)
+                    link_or_copy(ocr_results_file, txt_folder / cached_txt_name)
                 
                 # Create the "no table" final result cache
                 cached_final_name = f"{base_name}-{hash_suffix}_final_table.json"
@@ -592,13 +729,12 @@ def process_single_file(file_path: Path) -> Dict[str, Any]:
                     }
                 }]
                 
-                with open(json_folder / cached_final_name, 'w', encoding='utf-8') as f:
-                    json.dump(no_table_result, f, ensure_ascii=False, indent=2)
+                dump_json(no_table_result, json_folder / cached_final_name)
                 
-                print(f"  💾 Cached 'no table' result: {cached_final_name}")
+                log(f"  💾 Cached 'no table' result: {cached_final_name}")
                 
             except Exception as e:
-                print(f"  ⚠️  Could not cache 'no table' result: {e}")
+                log(f"  ⚠️  Could not cache 'no table' result: {e}")
         
         # Clean up temporary files
         ocr_results_file = Path(f"{base_name}_ocr_results.txt")
@@ -608,28 +744,62 @@ def process_single_file(file_path: Path) -> Dict[str, Any]:
         
         return {'filename': file_path.name, 'error': 'No table data extracted'}
 
+# Intermediate OCR files are written to the working directory as
+# "{stem}_tables.json", so files sharing a stem must not run concurrently
+_stem_locks = defaultdict(threading.Lock)
+_stem_locks_guard = threading.Lock()
+
+def process_file_exclusive(file_path: Path, folders: ResultFolders, stat_result=None,
+                           buffered=False) -> Tuple[Dict[str, Any], List[str]]:
+    """Run process_single_file while holding the lock for the file's stem
+    
+    Returns the result and, with buffered=True, the file's messages, which are
+    then collected instead of printed so files processed in parallel don't
+    interleave their output.
+    """
+    messages = []
+    log = messages.append if buffered else print
+    with _stem_locks_guard:
+        stem_lock = _stem_locks[file_path.stem]
+    with stem_lock:
+        return process_single_file(file_path, folders, stat_result, log), messages
+
+MAX_COLUMN_WIDTH = 50
+
+def column_widths(df: pd.DataFrame) -> List[int]:
+    """Excel column widths fitting each column's header and longest value"""
+    widths = []
+    for col in df.columns:
+        values = df[col].dropna()
+        max_length = len(str(col))
+        if not values.empty:
+            max_length = max(max_length, int(values.astype(str).str.len().max()))
+        widths.append(min(max_length + 2, MAX_COLUMN_WIDTH))
+    return widths
+
 def create_excel_output(processed_files: List[Dict], output_file: str):
     """Create Excel file with all extracted data"""
-    all_rows = []
+    # Build the sheet column-wise (column name -> {row number: value}) so the
+    # DataFrame is constructed once instead of from one dict per row
+    columns = {'Source File': {}}
+    row_count = 0
     
     for file_data in processed_files:
         filename = file_data['filename']
         
         if 'error' in file_data:
             # Add error row
-            all_rows.append({
-                'Source File': filename,
-                'Error': file_data['error']
-            })
+            columns['Source File'][row_count] = filename
+            columns.setdefault('Error', {})[row_count] = file_data['error']
+            row_count += 1
         elif 'table_data' in file_data:
             table_data = file_data['table_data']
             
             if not table_data:
                 # No data found
-                all_rows.append({
-                    'Source File': filename,
-                    'Error': 'No table data found'
-                })
+                columns['Source File'][row_count] = filename
+                columns.setdefault('Error', {})[row_count] = 'No table data found'
+                row_count += 1
             else:
                 # Extract individual rows from the table data
                 # table_data is expected to be a list with table info
@@ -637,34 +807,6 @@ def create_excel_output(processed_files: List[Dict], output_file: str):
                     if 'rows' in table_info and table_info['rows']:
                         rows = table_info['rows']
                         
-                        # Detect if the first row contains data instead of headers
-                        import re
-                        
-                        def is_id_like(value):
-                            """Check if a value looks like an ID"""
-                            if not value:
-                                return False
-                            val_str = str(value).strip()
-                            # Check for Israeli ID patterns (9 digits with optional spaces/separators)
-                            if re.match(r'^\d{2,3}\s*\d{5,6}$', val_str):  # e.g., "255 87932"
-                                return True
-                            if re.match(r'^\d{9}$', val_str):  # e.g., "123456789"
-                                return True
-                            if re.match(r'^\d{8,10}$', val_str):  # 8-10 digit IDs
-                                return True
-                            return False
-                        
-                        def has_header_like_content(row):
-                            """Check if a row contains header-like content"""
-                            header_words = ['id', 'name', 'שם', 'ת.ז', 'תז', 'ת״ז', 'מספר', 'זהות', 'first', 'last', 'תפקיד', 'position']
-                            for val in row:
-                                if val:
-                                    val_str = str(val).strip().lower()
-                                    for word in header_words:
-                                        if word in val_str:
-                                            return True
-                            return False
-                        
                         # Skip header row (first row) and process data rows
                         if len(rows) > 1:
                             first_row = rows[0]
@@ -683,25 +825,31 @@ def create_excel_output(processed_files: List[Dict], output_file: str):
                                 data_rows = rows[1:]  # Remaining rows contain data
                             
                             # Check if this file has Excel column names that need fixing
-                            excel_columns = [chr(i) for i in range(ord('A'), ord('Z')+1)]  # A-Z
-                            excel_col_count = sum(1 for h in headers if str(h).strip() in excel_columns)
+                            excel_col_count = sum(1 for h in headers if str(h).strip() in EXCEL_COLUMN_NAMES)
                             
                             # If more than 50% are Excel columns and we have data, check first data row for real headers
                             if (excel_col_count > len(headers) * 0.5 and len(headers) > 2 and 
                                 len(data_rows) > 0 and not first_row_has_ids):
                                 
                                 first_data_row = data_rows[0]
-                                # Count meaningful headers in first data row
+                                # Count meaningful headers in first data row, stopping as soon
+                                # as the threshold is reached or can no longer be reached
+                                threshold = len(headers) * 0.6
                                 meaningful_headers = 0
-                                import re
+                                remaining = len(first_data_row)
                                 for val in first_data_row:
-                                    if val and str(val).strip():
+                                    remaining -= 1
+                                    if val:
                                         val_str = str(val).strip()
-                                        if re.search(r'[\u0590-\u05FFa-zA-Z]', val_str) and len(val_str) > 1:
+                                        if len(val_str) > 1 and LETTER_PATTERN.search(val_str):
                                             meaningful_headers += 1
+                                            if meaningful_headers >= threshold:
+                                                break
+                                    if meaningful_headers + remaining < threshold:
+                                        break
                                 
                                 # If first data row looks like headers, use it
-                                if meaningful_headers >= len(headers) * 0.6:
+                                if meaningful_headers >= threshold:
                                     print(f"  🔄 Detected Excel headers in {filename}, using first data row as headers")
                                     
                                     # Use first data row as headers
@@ -711,7 +859,7 @@ def create_excel_output(processed_files: List[Dict], output_file: str):
                                             # Clean the header name
                                             header_name = str(val).strip()
                                             # Remove common artifacts
-                                            header_name = re.sub(r'[^\w\u0590-\u05FF\s\.\-]', '', header_name)
+                                            header_name = HEADER_INVALID_CHARS_PATTERN.sub('', header_name)
                                             header_name = ' '.join(header_name.split())
                                             real_headers.append(header_name)
                                         else:
@@ -721,32 +869,29 @@ def create_excel_output(processed_files: List[Dict], output_file: str):
                                     data_rows = data_rows[1:]  # Skip the row we used as headers
                             
                             # Filter and normalize headers
-                            filtered_headers = clean_and_normalize_headers(headers)
+                            filtered_headers = cached_normalized_headers(tuple(headers))
+                            header_count = len(filtered_headers)
                             for data_row in data_rows:
-                                row_data = {'Source File': filename}
+                                columns['Source File'][row_count] = filename
                                 
                                 # Map each cell to its corresponding filtered header
-                                for i, cell_value in enumerate(data_row):
-                                    if i < len(filtered_headers):
-                                        header = filtered_headers[i]
-                                        if header:  # Only include valid headers
-                                            row_data[header] = cell_value
-                                    else:
-                                        # Handle extra columns without headers
-                                        row_data[f'Column_{i+1}'] = cell_value
+                                for header, cell_value in zip(filtered_headers, data_row):
+                                    if header:  # Only include valid headers
+                                        columns.setdefault(header, {})[row_count] = cell_value
+                                
+                                # Handle extra columns without headers
+                                for i in range(header_count, len(data_row)):
+                                    columns.setdefault(f'Column_{i+1}', {})[row_count] = data_row[i]
                                 
-                                all_rows.append(row_data)
+                                row_count += 1
     
-    if not all_rows:
+    if not row_count:
         print("No data to export.")
         return
     
     # Create DataFrame and export to Excel
-    df = pd.DataFrame(all_rows)
-    
-    # Reorder columns to put 'Source File' first
-    cols = ['Source File'] + [col for col in df.columns if col != 'Source File']
-    df = df[cols]
+    # ('Source File' is the first key of columns, so it is already the first column)
+    df = pd.DataFrame(columns, index=range(row_count))
     
     # Apply column normalization before exporting
     print("\nApplying column normalization...")
@@ -756,25 +901,28 @@ def create_excel_output(processed_files: List[Dict], output_file: str):
     # Export to Excel
     excel_folder = Path('excel_results')
     excel_output_path = excel_folder / Path(output_file)
-    with pd.ExcelWriter(excel_output_path, engine='openpyxl') as writer:
+    if xlsxwriter is not None:
+        # Write strings as plain text (no per-string URL detection), as openpyxl does,
+        # and allow outputs beyond the 4 GB zip limit
+        engine = 'xlsxwriter'
+        engine_kwargs = {'options': {'strings_to_urls': False, 'use_zip64': True}}
+    else:
+        from openpyxl.utils import get_column_letter  # Only needed by the openpyxl fallback
+        engine = 'openpyxl'
+        engine_kwargs = None
+    with pd.ExcelWriter(excel_output_path, engine=engine, engine_kwargs=engine_kwargs) as writer:
         df_normalized.to_excel(writer, sheet_name='OCR Results', index=False)
         
-        # Auto-adjust column widths
+        # Auto-adjust column widths (computed from the DataFrame, not the written cells)
         worksheet = writer.sheets['OCR Results']
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet.column_dimensions[column_letter].width = adjusted_width
+        for i, width in enumerate(column_widths(df_normalized)):
+            if engine == 'xlsxwriter':
+                worksheet.set_column(i, i, width)
+            else:
+                worksheet.column_dimensions[get_column_letter(i + 1)].width = width
     
     print(f"\nResults exported to: {excel_output_path}")
-    print(f"Total rows processed: {len(all_rows)}")
+    print(f"Total rows processed: {row_count}")
     print(f"Normalized columns: {len(df_normalized.columns)}")
     
     # Summary statistics
@@ -786,8 +934,7 @@ def create_excel_output(processed_files: List[Dict], output_file: str):
     
     # Show final column structure
     print(f"\nFinal normalized columns:")
-    for i, col in enumerate(df_normalized.columns, 1):
-        non_null_count = df_normalized[col].notna().sum()
+    for i, (col, non_null_count) in enumerate(df_normalized.count().items(), 1):
         print(f"  {i:2d}. {col} ({non_null_count} values)")
 
 def main():
@@ -798,9 +945,14 @@ def main():
                        help='Directory containing files (default: files)')
     parser.add_argument('--limit', type=int, default=None,
                        help='Limit number of files to process (for testing)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Number of files to process in parallel (default: 1)')
     
     args = parser.parse_args()
     
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    
     # Check if files directory exists
     files_dir = Path(args.files_dir)
     if not files_dir.exists():
@@ -809,7 +961,8 @@ def main():
         return
     
     # Find all folders with supported files
-    folders = find_folders_in_directory(args.files_dir)
+    file_stats = {}
+    folders = find_folders_in_directory(args.files_dir, file_stats)
     
     if not folders:
         print(f"No folders with supported files found in '{args.files_dir}' directory.")
@@ -841,21 +994,36 @@ def main():
         print(f"File limit: {args.limit} (for testing)")
     print("=" * 70)
     
-    # Process each selected file
-    processed_files = []
+    # Create result folders once before any workers start
+    result_folders = create_result_folders()
+    
+    # Process selected files; OCR is network-bound so threads overlap the waits
+    # Results are reported as they complete but kept in input order for the Excel output
+    processed_files = [None] * len(selected_files)
     cached_count = 0
     api_calls_count = 0
     
-    for i, file_path in enumerate(selected_files, 1):
-        print(f"\n[{i}/{len(selected_files)}] Processing: {file_path.name}")
-        result = process_single_file(file_path)
-        processed_files.append(result)
-        
-        # Track cache usage
-        if result.get('cached', False):
-            cached_count += 1
-        elif 'error' not in result:
-            api_calls_count += 1
+    # With several workers each file's messages are printed together once it finishes
+    buffered = args.workers > 1
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(process_file_exclusive, file_path, result_folders,
+                            file_stats.get(file_path), buffered): index
+            for index, file_path in enumerate(selected_files)
+        }
+        for i, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            result, messages = future.result()
+            for message in messages:
+                print(message)
+            print(f"\n[{i}/{len(selected_files)}] Finished: {selected_files[index].name}")
+            processed_files[index] = result
+            
+            # Track cache usage
+            if result.get('cached', False):
+                cached_count += 1
+            elif 'error' not in result:
+                api_calls_count += 1
     
     # Print cache statistics
     print("\n" + "=" * 70)
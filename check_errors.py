@@ -1,17 +1,29 @@
 #!/usr/bin/env python3
 
-import pandas as pd
-import json
 import os
 import hashlib
+import functools
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from json_io import load_json
+from excel_io import read_excel
+
+@functools.lru_cache(maxsize=4096)
+def _file_hash(filepath, mtime_ns, size):
+    """MD5 prefix of a file version; mtime and size make the cache key change with the file"""
+    with open(filepath, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+            return hashlib.file_digest(f, 'md5').hexdigest()[:8]
+        hasher = hashlib.md5()
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+        return hasher.hexdigest()[:8]
 
 def get_file_hash(filepath):
-    """Calculate MD5 hash of file content"""
+    """Calculate MD5 hash of file content (first 8 hex chars, as used in cache file names)"""
     try:
-        with open(filepath, 'rb') as f:
-            content = f.read()
-        return hashlib.md5(content).hexdigest()[:8]
+        stat_result = os.stat(filepath)
+        return _file_hash(str(filepath), stat_result.st_mtime_ns, stat_result.st_size)
     except:
         return None
 
@@ -24,7 +36,7 @@ def analyze_excel_errors():
         print(f"❌ Excel file not found: {excel_path}")
         return
     
-    df = pd.read_excel(excel_path)
+    df = read_excel(excel_path)
     print(f"📊 Total rows in Excel: {len(df)}")
     
     # Filter rows with 'No table data extracted' in Error column
@@ -42,16 +54,27 @@ def analyze_excel_errors():
     print("\n🔍 Checking JSON cache files for these errors...")
     print("=" * 80)
     
-    for idx, row in error_rows.head(20).iterrows():  # Check first 20 errors
-        source_file = row['Source File']
+    # Load the cache files in parallel up front; they are reported in order below
+    pending = []
+    loads = {}  # json_file -> future, so a cache file shared by several rows is parsed once
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for idx, row in error_rows.head(20).iterrows():  # Check first 20 errors
+            source_file = row['Source File']
+            
+            # Find JSON cache file by filename pattern
+            # Files are stored as: filename_tables.json (filename without its extension)
+            base_name = Path(source_file).stem
+            json_file = cache_dir / f"{base_name}_tables.json"
+            
+            if json_file not in loads:
+                loads[json_file] = executor.submit(load_json, json_file) if json_file.exists() else None
+            future = loads[json_file]
+            pending.append((source_file, json_file, future))
+    
+    for source_file, json_file, future in pending:
         print(f"\n📄 Checking: {source_file}")
         
-        # Find JSON cache file by filename pattern
-        # Files are stored as: filename_tables.json
-        base_name = source_file.replace('.jpg', '').replace('.jpeg', '').replace('.png', '').replace('.gif', '')
-        json_file = cache_dir / f"{base_name}_tables.json"
-        
-        if not json_file.exists():
+        if future is None:
             print(f"   ❌ Cache file not found: {json_file}")
             continue
         
@@ -59,8 +82,7 @@ def analyze_excel_errors():
         
         # Read and analyze JSON cache
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
+            cache_data = future.result()
             
             print(f"   ✅ Cache file found: {json_file}")
             
@@ -1,9 +1,9 @@
 #!/usr/bin/env python3
 
-import pandas as pd
+from excel_io import read_excel
 
 # Read the Excel file
-df = pd.read_excel('test_img_final_fix.xlsx')
+df = read_excel('test_img_final_fix.xlsx')
 
 # Check if the IMG file is in the data
 img_rows = df[df['Source File'].str.contains('IMG-20240321-WA0015', na=False)]
@@ -16,10 +16,9 @@ if len(img_rows) > 0:
     print(img_rows.head())
     
     print(f"\nColumns with data from IMG file:")
-    for col in df.columns:
-        img_col_data = img_rows[col].dropna()
-        if len(img_col_data) > 0:
-            print(f"  {col}: {len(img_col_data)} values")
+    counts = img_rows.count()
+    for col, count in counts[counts > 0].items():
+        print(f"  {col}: {count} values")
 else:
     print("❌ No data from IMG-20240321-WA0015 found in final Excel!")
 
@@ -1,57 +1,59 @@
 #!/usr/bin/env python3
 
-import subprocess
-import sys
 from pathlib import Path
-import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+import sample_analyze_read
+from json_io import load_json
 
 def check_file(file_path):
-    """Check a specific file for tables"""
+    """Check a specific file for tables
+    
+    The 300 s timeout only bounds the wait for the OCR result, unlike the old
+    subprocess timeout that killed the whole run: the upload is not limited and a
+    timed-out analysis is not cancelled (it keeps polling in the background).
+    run() hashes the file once for its cache lookup; nothing here has hashed it
+    before, so there is no file_hash to pass along.
+    """
     if not os.path.exists(file_path):
         return f"❌ File not found: {file_path}"
     
     print(f"🔍 Analyzing: {os.path.basename(file_path)}")
     
-    # Run OCR analysis
-    cmd = [sys.executable, 'sample_analyze_read.py', file_path, '--json']
+    # Run OCR analysis in-process (reuses the cache and the loaded Azure SDK)
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-        if result.returncode != 0:
-            return f"❌ OCR failed: {result.stderr.strip()}"
+        sample_analyze_read.run(file_path, save_json=True, verbose=False, timeout=300)
+    except TimeoutError:
+        return "❌ Timeout during analysis"
+    except Exception as e:
+        return f"❌ OCR failed: {type(e).__name__}: {e}"
+    
+    # Check if JSON file was created
+    base_name = Path(file_path).stem
+    json_file = Path(f"{base_name}_tables.json")
+    
+    if not json_file.exists():
+        return "✅ Confirmed: No tables detected"
+    
+    try:
+        data = load_json(json_file)
         
-        # Check if JSON file was created
-        base_name = Path(file_path).stem
-        json_file = Path(f"{base_name}_tables.json")
+        # Clean up
+        json_file.unlink()
+        ocr_file = Path(f"{base_name}_ocr_results.txt")
+        if ocr_file.exists():
+            ocr_file.unlink()
         
-        if json_file.exists():
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                # Clean up
-                json_file.unlink()
-                ocr_file = Path(f"{base_name}_ocr_results.txt")
-                if ocr_file.exists():
-                    ocr_file.unlink()
-                
-                # Check if tables were found
-                if 'tables' in data and len(data['tables']) > 0:
-                    table_count = len(data['tables'])
-                    total_cells = sum(len(table.get('cells', [])) for table in data['tables'])
-                    return f"✅ FOUND {table_count} table(s) with {total_cells} total cells!"
-                else:
-                    return "✅ Confirmed: No tables detected"
-                    
-            except Exception as e:
-                return f"❌ Error reading results: {e}"
+        # Check if tables were found
+        if 'tables' in data and len(data['tables']) > 0:
+            table_count = len(data['tables'])
+            total_cells = sum(len(table.get('cells', [])) for table in data['tables'])
+            return f"✅ FOUND {table_count} table(s) with {total_cells} total cells!"
         else:
             return "✅ Confirmed: No tables detected"
             
-    except subprocess.TimeoutExpired:
-        return "❌ Timeout during analysis"
     except Exception as e:
-        return f"❌ Unexpected error: {e}"
+        return f"❌ Error reading results: {e}"
 
 def main():
     print("🔍 CHECKING SPECIFIC FILES FOR HIDDEN TABLES")
@@ -78,9 +80,13 @@ def main():
     confirmed_no_tables = []
     errors = []
     
-    for i, file_path in enumerate(test_files, 1):
+    # Each file is an independent, network-bound OCR call, so check them concurrently
+    # (the test files have distinct stems, so their working-directory outputs don't collide)
+    with ThreadPoolExecutor(max_workers=min(10, len(test_files))) as executor:
+        results = list(executor.map(check_file, test_files))
+    
+    for i, (file_path, result) in enumerate(zip(test_files, results), 1):
         print(f"[{i}/{len(test_files)}] {os.path.basename(file_path)}")
-        result = check_file(file_path)
         print(f"  {result}")
         
         if "FOUND" in result:
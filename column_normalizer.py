@@ -5,20 +5,153 @@ Normalizes duplicate columns that contain the same type of data
 """
 
 import pandas as pd
+import numpy as np
 from typing import Dict, List, Any
-import json
+import os
 import re
+import functools
+import string
+from json_io import load_json, dump_json
+
+# String dtype for the vectorized checks. The Python-backed storage is used even
+# when pyarrow is installed: Arrow runs .str regexes with RE2, which rejects \u
+# escapes and only treats ASCII characters as \d, so results would change.
+STRING_DTYPE = pd.StringDtype('python')
+
+# Cleanup steps applied in order by clean_column_name: (pattern, replacement).
+# Character-class deletions that cannot interact are merged into one pass:
+# a single \s+ pass also covers newlines, and the final allow-list already
+# drops quotes, brackets and (once whitespace is collapsed) control characters.
+CLEAN_PATTERNS = [
+    # Remove :selected: and :unselected: patterns
+    (re.compile(r':selected:'), ''),
+    (re.compile(r':unselected:'), ''),
+    # Remove Arabic/foreign characters mixed with Hebrew (Arabic, Latin extended)
+    (re.compile(r'[\u0080-\u00FF\u0600-\u06FF]'), ''),
+    # Remove various OCR artifacts
+    (re.compile(r'[V\(\)]\s*PINVIS.*'), ''),
+    (re.compile(r'\d+Nd\s+DOIS.*'), ''),
+    (re.compile(r'Good\s*Neutral.*'), ''),
+    (re.compile(r'\d+/\d+/\d+'), ''),  # Dates that became column names
+    # Clean up newlines and multiple spaces
+    (re.compile(r'\s+'), ' '),
+    # Remove HTML-like patterns
+    (re.compile(r'<[^>]+>'), ''),
+    # Keep Hebrew/English letters, numbers, dots, hyphens, and spaces
+    # (removes quotes, brackets, control characters and other symbols)
+    (re.compile(r'[^\w\u0590-\u05FF\s\.\-]'), ''),
+]
+
+# Patterns for spotting data values that ended up as column headers
+HEBREW_WORD_PATTERN = re.compile(r'[\u0590-\u05FF]+')
+ENGLISH_WORD_PATTERN = re.compile(r'[a-zA-Z]+')
+LONG_NUMBER_PATTERN = re.compile(r'\d{7,}')
+LETTER_PATTERN = re.compile(r'[\u0590-\u05FFa-zA-Z]')  # Hebrew or English letter
+# Dates, ID numbers (7-12 digits) and phone numbers, tried as one alternation with .match()
+DATA_HEADER_PATTERN = re.compile(
+    r'\d{1,2}/\d{1,2}/\d{2,4}'      # MM/DD/YYYY or DD/MM/YYYY
+    r'|\d{4}-\d{2}-\d{2}'           # YYYY-MM-DD
+    r'|\d{1,2}\.\d{1,2}\.\d{2,4}'   # DD.MM.YYYY
+    r'|\d{7,12}$'                    # IDs (and 10-digit phone numbers)
+    r'|\d{3}-\d{3}-\d{4}$'          # 123-456-7890
+)
+# Values that int() accepts after stripping (an optional sign and digits)
+INTEGER_PATTERN = re.compile(r'[+-]?\d+')
+# ID-like values: regular (Israeli) IDs have 9 digits, military IDs 7-8 digits
+GENERAL_ID_PATTERN = re.compile(r'^\d{7,10}$')
+# OCR artifacts that show up as column names
+OCR_ARTIFACTS = ('V(PINVIS', 'Nd DOIS', 'Good Neutral')
+
+# Upper bound on the per-normalizer memo of column -> matching mappings
+MAX_CACHED_COLUMN_MATCHES = 8192
+
+# Output column order after normalization (other columns follow in their existing order)
+PREFERRED_COLUMN_ORDER = [
+    'Source File',
+    'ID', 'First Name', 'Last Name', 'Employee Number', 
+    'Title/Position', 'Date of Birth', 'Nationality', 'Phone Number',
+    'Product Description', 'Quantity', 'Price', 'Supply Date',
+    'Row Number', 'Balance', 'Signature'
+]
+
+# Spreadsheet column letters used as placeholder headers
+EXCEL_COLUMN_NAMES = frozenset(string.ascii_uppercase)  # A-Z
+
+@functools.lru_cache(maxsize=8192, typed=True)
+def _clean_column_name(col_name: str) -> str:
+    """Clean column name (see ColumnNormalizer.clean_column_name); memoized because
+    the same names and variants are cleaned over and over while matching"""
+    if not col_name:
+        return ""
+    
+    # Convert to string and strip whitespace
+    cleaned = str(col_name).strip()
+    
+    # Handle special cases
+    if cleaned.startswith('Unnamed:'):
+        return ""  # Empty unnamed columns
+    
+    # Remove OCR artifacts, stray characters and markup
+    for pattern, replacement in CLEAN_PATTERNS:
+        cleaned = pattern.sub(replacement, cleaned)
+    
+    # Remove extra whitespace
+    cleaned = ' '.join(cleaned.split())
+    
+    # Remove trailing dots unless it's a meaningful abbreviation
+    if cleaned.endswith('.') and len(cleaned) > 3:
+        cleaned = cleaned.rstrip('.')
+    
+    # Remove leading/trailing special characters
+    cleaned = cleaned.strip('.-_')
+    
+    return cleaned
 
 class ColumnNormalizer:
+    # Parsed config files shared by all instances: path -> ((mtime_ns, size), mapping)
+    _config_cache: Dict[str, Any] = {}
+    
     def __init__(self, config_file='column_mapping.json'):
         self.config_file = config_file
         self.column_mapping = self.load_or_create_config()
+        self._build_variant_index()
+    
+    def _build_variant_index(self) -> None:
+        """Index the configured variants so find_matching_columns can look up
+        exact matches instead of scanning every variant of every mapping"""
+        self._exact_variants = {}    # raw variant -> normalized names
+        self._cleaned_variants = {}  # cleaned lowercase variant -> normalized names
+        self._partial_variants = {}  # normalized name -> (joined variants, variant alternation)
+        self._column_matches = {}    # (type, column) -> matching normalized names
+        for normalized_name, variants in self.column_mapping.items():
+            long_variants = []
+            for variant in variants:
+                variant_lower = self.clean_column_name(variant).lower()
+                self._exact_variants.setdefault(variant, set()).add(normalized_name)
+                self._cleaned_variants.setdefault(variant_lower, set()).add(normalized_name)
+                if len(variant_lower) > 2:  # Short variants never take part in partial matches
+                    long_variants.append(variant_lower)
+            if long_variants:
+                # Cleaned names never contain '\0', so "column in any variant" is a
+                # single substring search of the joined string, and "any variant
+                # in column" is a single search with an alternation of the variants
+                self._partial_variants[normalized_name] = (
+                    '\0'.join(long_variants),
+                    re.compile('|'.join(map(re.escape, long_variants)))
+                )
     
     def load_or_create_config(self) -> Dict[str, List[str]]:
         """Load existing config or create default one"""
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            # Reuse the parsed file while it is unchanged on disk; each instance
+            # gets its own lists so add_column_mapping cannot leak into others
+            stat_result = os.stat(self.config_file)
+            version = (stat_result.st_mtime_ns, stat_result.st_size)
+            cached = ColumnNormalizer._config_cache.get(self.config_file)
+            if cached is None or cached[0] != version:
+                cached = (version, load_json(self.config_file))
+                ColumnNormalizer._config_cache[self.config_file] = cached
+            return {name: list(variants) for name, variants in cached[1].items()}
         except FileNotFoundError:
             # Create default configuration based on your current findings
             default_config = {
@@ -132,119 +265,69 @@ class ColumnNormalizer:
     
     def clean_column_name(self, col_name: str) -> str:
         """Clean column name by removing special characters and trimming whitespace"""
-        if not col_name:
-            return ""
-        
-        # Convert to string and strip whitespace
-        cleaned = str(col_name).strip()
-        
-        # Handle special cases
-        if cleaned.startswith('Unnamed:'):
-            return ""  # Empty unnamed columns
-        
-        # Remove problematic patterns
-        # Remove :selected: and :unselected: patterns
-        cleaned = re.sub(r':selected:', '', cleaned)
-        cleaned = re.sub(r':unselected:', '', cleaned)
-        
-        # Remove Arabic/foreign characters mixed with Hebrew
-        cleaned = re.sub(r'[\u0600-\u06FF]', '', cleaned)  # Arabic
-        cleaned = re.sub(r'[\u0080-\u00FF]', '', cleaned)  # Latin extended
-        
-        # Remove various OCR artifacts
-        cleaned = re.sub(r'[V\(\)]\s*PINVIS.*', '', cleaned)
-        cleaned = re.sub(r'\d+Nd\s+DOIS.*', '', cleaned)
-        cleaned = re.sub(r'Good\s*Neutral.*', '', cleaned)
-        cleaned = re.sub(r'\d+/\d+/\d+', '', cleaned)  # Dates that became column names
-        
-        # Clean up newlines and multiple spaces
-        cleaned = re.sub(r'\n+', ' ', cleaned)
-        cleaned = re.sub(r'\s+', ' ', cleaned)
-        
-        # Remove HTML-like patterns
-        cleaned = re.sub(r'<[^>]+>', '', cleaned)
-        
-        # Remove common OCR artifacts
-        cleaned = re.sub(r'[\(\)\"\']', '', cleaned)
-        
-        # Remove Unicode control characters and weird symbols
-        cleaned = re.sub(r'[\u0000-\u001F\u007F-\u009F]', '', cleaned)
-        
-        # Keep Hebrew/English letters, numbers, dots, hyphens, and spaces
-        cleaned = re.sub(r'[^\w\u0590-\u05FF\s\.\-]', '', cleaned)
-        
-        # Remove extra whitespace
-        cleaned = ' '.join(cleaned.split())
-        
-        # Remove trailing dots unless it's a meaningful abbreviation
-        if cleaned.endswith('.') and len(cleaned) > 3:
-            cleaned = cleaned.rstrip('.')
-        
-        # Remove leading/trailing special characters
-        cleaned = cleaned.strip('.-_')
-        
-        return cleaned
+        return _clean_column_name(col_name)
     
     def save_config(self, config: Dict[str, List[str]]) -> None:
         """Save configuration to file"""
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
+        dump_json(config, self.config_file)
         print(f"Column mapping configuration saved to: {self.config_file}")
     
     def add_column_mapping(self, normalized_name: str, column_variants: List[str]) -> None:
         """Add or update column mapping"""
         self.column_mapping[normalized_name] = column_variants
+        self._build_variant_index()
         self.save_config(self.column_mapping)
         print(f"Added mapping: {normalized_name} -> {column_variants}")
     
+    def _match_column(self, col) -> tuple:
+        """Names of the mappings a single column matches, in mapping order"""
+        no_match = set()
+        
+        # Clean the column name first
+        col_cleaned = self.clean_column_name(col)
+        col_lower = col_cleaned.lower()
+        
+        # Exact match (original or cleaned), or cleaned versions equal (case insensitive)
+        exact = (self._exact_variants.get(col, no_match) |
+                 self._exact_variants.get(col_cleaned, no_match) |
+                 self._cleaned_variants.get(col_lower, no_match))
+        
+        matched = []
+        for normalized_name in self.column_mapping:
+            if normalized_name in exact:
+                matched.append(normalized_name)
+                continue
+            
+            # Partial match for complex headers
+            # Only if it's a significant match (avoid matching very short strings)
+            partial = self._partial_variants.get(normalized_name)
+            if partial and len(col_lower) > 2:
+                joined_variants, variant_pattern = partial
+                if col_lower in joined_variants or variant_pattern.search(col_lower):
+                    matched.append(normalized_name)
+        return tuple(matched)
+    
     def find_matching_columns(self, df_columns: List[str]) -> Dict[str, List[str]]:
         """Find which columns in the DataFrame match our mapping"""
-        matches = {}
-        
-        for normalized_name, variants in self.column_mapping.items():
-            found_columns = []
-            
-            for col in df_columns:
-                # Clean the column name first
-                col_cleaned = self.clean_column_name(col)
-                
-                # Exact match (original)
-                if col in variants:
-                    found_columns.append(col)
-                    continue
-                
-                # Exact match (cleaned)
-                if col_cleaned in variants:
-                    found_columns.append(col)
-                    continue
-                
-                # Clean variants for comparison
-                for variant in variants:
-                    variant_cleaned = self.clean_column_name(variant)
-                    
-                    # Match cleaned versions (case insensitive)
-                    col_lower = col_cleaned.lower()
-                    variant_lower = variant_cleaned.lower()
-                    
-                    if col_lower == variant_lower:
-                        found_columns.append(col)
-                        break
-                    
-                    # Partial match for complex headers
-                    if variant_lower in col_lower or col_lower in variant_lower:
-                        # Only if it's a significant match (> 70% of the shorter string)
-                        shorter_len = min(len(col_lower), len(variant_lower))
-                        if shorter_len > 2:  # Avoid matching very short strings
-                            found_columns.append(col)
-                            break
-            
-            # Remove duplicates while preserving order
-            found_columns = list(dict.fromkeys(found_columns))
-            
-            if found_columns:
-                matches[normalized_name] = found_columns
-        
-        return matches
+        found = {normalized_name: [] for normalized_name in self.column_mapping}
+        
+        for col in df_columns:
+            # The same headers come back in every document of a batch, so the
+            # mappings a column matches are remembered until the mapping changes
+            # (the type is part of the key because 1, 1.0 and True clean differently)
+            key = (type(col), col)
+            matched = self._column_matches.get(key)
+            if matched is None:
+                matched = self._match_column(col)
+                if len(self._column_matches) >= MAX_CACHED_COLUMN_MATCHES:
+                    self._column_matches.clear()
+                self._column_matches[key] = matched
+            for normalized_name in matched:
+                found[normalized_name].append(col)
+        
+        # Remove duplicates while preserving order
+        return {normalized_name: list(dict.fromkeys(found_columns))
+                for normalized_name, found_columns in found.items() if found_columns}
     
     def detect_data_as_headers(self, df: pd.DataFrame) -> pd.DataFrame:
         """Detect if data content is being used as column headers"""
@@ -263,41 +346,31 @@ class ColumnNormalizer:
             if not col_str:
                 continue
             
-            # Check for patterns that suggest this is data, not a header:
-            # 1. Contains multiple Hebrew/English names (like "ליאל גניש ואוהד שמח")
-            # 2. Contains numbers that look like IDs or dates
-            # 3. Contains phone numbers
-            # 4. Contains long text that looks like content
-            
-            is_suspicious = False
-            
-            # Pattern 1: Multiple names (Hebrew or English)
-            # Look for Hebrew names pattern: multiple Hebrew words with "ו" (and) or spaces
-            hebrew_words = re.findall(r'[\u0590-\u05FF]+', col_str)
-            english_words = re.findall(r'[a-zA-Z]+', col_str)
-            
-            if len(hebrew_words) >= 3 or len(english_words) >= 3:
-                # Multiple words suggest this might be content, not a header
+            # Check for patterns that suggest this is data, not a header.
+            # The cheap length/separator checks run first and the regex checks
+            # only run while nothing has matched yet.
+            # Pattern 1: Very long text (more than 30 characters) is likely content
+            if len(col_str) > 30:
                 is_suspicious = True
             
-            # Pattern 2: Contains "ו" (Hebrew "and") which suggests multiple names
-            if 'ו' in col_str and len(hebrew_words) >= 2:
+            # Pattern 2: Contains common data separators like "|" or "," with meaningful content
+            elif ('|' in col_str or ',' in col_str) and len(col_str) > 10:
                 is_suspicious = True
             
-            # Pattern 3: Contains numbers that look like IDs, phone numbers, or dates
-            numbers = re.findall(r'\d+', col_str)
-            for num in numbers:
-                if len(num) >= 7:  # Long numbers (IDs, phones) shouldn't be headers
-                    is_suspicious = True
-                    break
-            
-            # Pattern 4: Very long text (more than 30 characters) is likely content
-            if len(col_str) > 30:
+            # Pattern 3: Contains numbers that look like IDs or phone numbers
+            # (long numbers shouldn't be headers)
+            elif LONG_NUMBER_PATTERN.search(col_str):
                 is_suspicious = True
             
-            # Pattern 5: Contains common data separators like "|" or "," with meaningful content
-            if ('|' in col_str or ',' in col_str) and len(col_str) > 10:
-                is_suspicious = True
+            else:
+                # Pattern 4: Multiple names (Hebrew or English), like "ליאל גניש ואוהד שמח",
+                # or Hebrew words joined by "ו" (Hebrew "and")
+                hebrew_count = len(HEBREW_WORD_PATTERN.findall(col_str))
+                is_suspicious = (
+                    hebrew_count >= 3 or
+                    ('ו' in col_str and hebrew_count >= 2) or
+                    len(ENGLISH_WORD_PATTERN.findall(col_str)) >= 3
+                )
             
             if is_suspicious:
                 suspicious_headers.append(col)
@@ -314,29 +387,24 @@ class ColumnNormalizer:
             
             # Check first 3 rows for potential headers
             for row_idx in range(min(3, len(df))):
-                current_row = df.iloc[row_idx]
+                # Strip the whole row as strings once and test every cell with
+                # vectorized masks (missing cells stay <NA>)
+                row_str = df.iloc[row_idx].astype(STRING_DTYPE).str.strip()
                 
-                # Count how many cells look like proper column headers
-                header_like_count = 0
-                potential_headers = []
+                # Check which cells look like proper headers (not data)
+                header_like = (
+                    row_str.notna() & (row_str != '') &
+                    (row_str.str.len() <= 25) &  # Not too long
+                    ~row_str.str.contains(LONG_NUMBER_PATTERN, na=False) &  # No long numbers
+                    ~(row_str.str.contains('ו', regex=False, na=False) &
+                      (row_str.str.count(HEBREW_WORD_PATTERN.pattern) >= 3)) &  # Not multiple Hebrew names
+                    ~row_str.isin(suspicious_headers)  # Not already a suspicious header
+                ).fillna(False)
                 
-                for val in current_row:
-                    if pd.notna(val) and str(val).strip():
-                        val_str = str(val).strip()
-                        
-                        # Check if this looks like a proper header (not data)
-                        looks_like_header = (
-                            len(val_str) <= 25 and  # Not too long
-                            not re.search(r'\d{7,}', val_str) and  # No long numbers
-                            not ('ו' in val_str and len(re.findall(r'[\u0590-\u05FF]+', val_str)) >= 3) and  # Not multiple Hebrew names
-                            val_str not in suspicious_headers  # Not already a suspicious header
-                        )
-                        
-                        if looks_like_header:
-                            header_like_count += 1
-                            potential_headers.append(val_str)
-                        else:
-                            potential_headers.append(None)
+                # Count how many cells look like proper column headers
+                header_like_count = int(header_like.sum())
+                potential_headers = [val if is_header else None
+                                     for val, is_header in zip(row_str.tolist(), header_like.tolist())]
                 
                 # If this row has mostly header-like content, use it
                 if header_like_count >= total_cols * 0.6:
@@ -356,17 +424,16 @@ class ColumnNormalizer:
                         else:
                             new_columns.append(f"Column_{i+1}")  # Fallback name
                     
-                    # Convert suspicious headers to data
-                    # Insert the old headers as a new first row
+                    # Convert suspicious headers to data: insert the old headers as a
+                    # new first row and leave out the row we used as headers, in a
+                    # single concat of row slices (ignore_index renumbers the rows)
                     old_headers_row = pd.DataFrame([df.columns], columns=df.columns)
-                    df_with_old_headers = pd.concat([old_headers_row, df], ignore_index=True)
+                    df_with_old_headers = pd.concat(
+                        [old_headers_row, df.iloc[:row_idx], df.iloc[row_idx + 1:]], ignore_index=True)
                     
                     # Update column names
                     df_with_old_headers.columns = new_columns
                     
-                    # Remove the row we used as headers
-                    df_with_old_headers = df_with_old_headers.drop(df_with_old_headers.index[row_idx + 1]).reset_index(drop=True)
-                    
                     print(f"  → Converted {len(suspicious_headers)} suspicious headers to data")
                     print(f"  → Updated {len(new_columns)} column headers")
                     
@@ -379,10 +446,8 @@ class ColumnNormalizer:
         if len(df) < 1:
             return df
             
-        excel_columns = [chr(i) for i in range(ord('A'), ord('Z')+1)]  # A-Z
-        
         # Check if current column names are mostly Excel column names
-        excel_col_count = sum(1 for col in df.columns if str(col).strip() in excel_columns)
+        excel_col_count = sum(1 for col in df.columns if str(col).strip() in EXCEL_COLUMN_NAMES)
         total_cols = len(df.columns)
         
         # If more than 50% of columns are Excel column names, check if first row has better headers
@@ -392,13 +457,14 @@ class ColumnNormalizer:
             
             if first_row is not None:
                 # Count how many cells in first row contain meaningful text (Hebrew/English letters)
-                meaningful_headers = 0
-                for val in first_row:
-                    if pd.notna(val) and str(val).strip():
-                        val_str = str(val).strip()
-                        # Check if contains letters (Hebrew or English)
-                        if re.search(r'[\u0590-\u05FFa-zA-Z]', val_str) and len(val_str) > 1:
-                            meaningful_headers += 1
+                row_str = first_row.astype(STRING_DTYPE).str.strip()
+                nonempty = (row_str.notna() & (row_str != '')).fillna(False)
+                meaningful = (
+                    nonempty &
+                    row_str.str.contains(LETTER_PATTERN, na=False) &
+                    (row_str.str.len() > 1)
+                ).fillna(False)
+                meaningful_headers = int(meaningful.sum())
                 
                 # If most cells in first row look like headers, use them
                 if meaningful_headers >= total_cols * 0.6:
@@ -407,11 +473,10 @@ class ColumnNormalizer:
                     
                     # Create new column names from first row
                     new_columns = []
-                    for i, (old_col, new_val) in enumerate(zip(df.columns, first_row)):
-                        if pd.notna(new_val) and str(new_val).strip():
-                            new_col_name = str(new_val).strip()
+                    for old_col, new_val, has_value in zip(df.columns, row_str.tolist(), nonempty.tolist()):
+                        if has_value:
                             # Clean the new column name
-                            new_col_name = self.clean_column_name(new_col_name)
+                            new_col_name = self.clean_column_name(new_val)
                             if new_col_name:
                                 new_columns.append(new_col_name)
                                 print(f"  Column '{old_col}' → '{new_col_name}'")
@@ -420,12 +485,13 @@ class ColumnNormalizer:
                         else:
                             new_columns.append(old_col)  # Keep original if no meaningful value
                     
+                    # Remove the first row since it's now used as headers (this returns
+                    # a new frame, so renaming its columns leaves the caller's frame alone)
+                    df = df.drop(df.index[0]).reset_index(drop=True)
+                    
                     # Update column names
                     df.columns = new_columns
                     
-                    # Remove the first row since it's now used as headers
-                    df = df.drop(df.index[0]).reset_index(drop=True)
-                    
                     print(f"  → Updated {len(new_columns)} column headers")
                     print(f"  → Removed header row from data")
                     
@@ -435,12 +501,17 @@ class ColumnNormalizer:
     
     def filter_excel_column_names(self, df: pd.DataFrame) -> pd.DataFrame:
         """Remove Excel column names (A, B, C, D, etc.) that are not valid data columns"""
-        excel_columns = [chr(i) for i in range(ord('A'), ord('Z')+1)]  # A-Z
-        
+        columns_to_remove = self.excel_name_columns_to_remove(df)
+        return df.drop(columns=columns_to_remove) if columns_to_remove else df
+    
+    def excel_name_columns_to_remove(self, df: pd.DataFrame, skip=frozenset()) -> List[str]:
+        """Report and return the Excel column names (A, B, C, D, etc.) to remove"""
         columns_to_remove = []
         for col in df.columns:
+            if col in skip:
+                continue
             col_str = str(col).strip()
-            if col_str in excel_columns:
+            if col_str in EXCEL_COLUMN_NAMES:
                 columns_to_remove.append(col)
         
         if columns_to_remove:
@@ -450,26 +521,30 @@ class ColumnNormalizer:
                 non_null_count = df[col].notna().sum()
                 print(f"  Removing '{col}' (Excel column name, {non_null_count} values)")
             
-            df = df.drop(columns=columns_to_remove)
             print(f"  → Removed {len(columns_to_remove)} Excel column names")
         
-        return df
+        return columns_to_remove
     
     def filter_empty_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """Remove columns that are empty or have no meaningful data"""
+        columns_to_remove = self.empty_columns_to_remove(df)
+        return df.drop(columns=columns_to_remove) if columns_to_remove else df
+    
+    def empty_columns_to_remove(self, df: pd.DataFrame, skip=frozenset()) -> List[str]:
+        """Report and return the empty or meaningless columns to remove"""
         columns_to_remove = []
+        non_null_counts = dict(zip(df.columns, df.count()))  # Counted in one pass
         
-        for col in df.columns:
+        for col, non_null_count in non_null_counts.items():
             col_str = str(col).strip()
             
-            # Skip Source File column
-            if col == 'Source File':
+            # Skip Source File column (and columns already selected for removal)
+            if col == 'Source File' or col in skip:
                 continue
             
             # Remove unnamed columns
             if col_str.startswith('Unnamed:') or col_str == '':
                 # But only if they have very little data
-                non_null_count = df[col].notna().sum()
                 if non_null_count < 5:  # Less than 5 non-null values
                     columns_to_remove.append(col)
                     continue
@@ -482,7 +557,6 @@ class ColumnNormalizer:
             # Remove columns that are clearly OCR artifacts
             if (len(col_str) == 1 and col_str.isdigit()) or col_str in ['1', '2', '3', '4', '5']:
                 # Single digit column names are usually artifacts
-                non_null_count = df[col].notna().sum()
                 if non_null_count < 10:  # Unless they have significant data
                     columns_to_remove.append(col)
         
@@ -490,23 +564,15 @@ class ColumnNormalizer:
             print(f"\n🧹 CLEANING EMPTY/MEANINGLESS COLUMNS:")
             print("=" * 50)
             for col in columns_to_remove:
-                non_null_count = df[col].notna().sum()
                 col_display = f'"{col}"' if col.strip() == '' else col
-                print(f"  Removing {col_display} ({non_null_count} values - low quality data)")
+                print(f"  Removing {col_display} ({non_null_counts[col]} values - low quality data)")
             
-            df = df.drop(columns=columns_to_remove)
             print(f"  → Removed {len(columns_to_remove)} low-quality columns")
         
-        return df
+        return columns_to_remove
     
     def fix_misplaced_id_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Detect and fix columns that contain ID data but have wrong column names"""
-        import re
-        
-        # Regular ID pattern (Israeli ID - 9 digits) vs Military ID pattern (7-8 digits)
-        regular_id_pattern = re.compile(r'^\d{9}$')
-        military_id_pattern = re.compile(r'^\d{7,8}$')
-        general_id_pattern = re.compile(r'^\d{7,10}$')
         problematic_columns = []
         
         # Check for columns that might contain misplaced ID data
@@ -514,25 +580,22 @@ class ColumnNormalizer:
             if col in ['ID', 'Employee Number', 'Serial Number', 'Military ID', 'Phone Number', 'Phone', 'Source File']:
                 continue  # Skip columns that should contain numbers
             
-            # Check if this column contains mostly ID-like values
-            sample_values = df[col].dropna().head(20)
+            # Check if this column contains mostly ID-like values (a duplicated
+            # name selects a DataFrame, whose values can't be checked as one column)
+            column = df[col]
+            if isinstance(column, pd.DataFrame):
+                continue
+            sample_values = column.dropna().head(20)
             if len(sample_values) == 0:
                 continue
                 
-            id_like_count = 0
-            military_like_count = 0
-            regular_id_like_count = 0
-            
-            for val in sample_values:
-                val_str = str(val).strip()
-                if regular_id_pattern.match(val_str):
-                    regular_id_like_count += 1
-                    id_like_count += 1
-                elif military_id_pattern.match(val_str):
-                    military_like_count += 1
-                    id_like_count += 1
-                elif general_id_pattern.match(val_str):
-                    id_like_count += 1
+            # Classify the sample with one vectorized match; the length of each
+            # ID-like value tells regular IDs (9 digits) from military IDs (7-8 digits)
+            sample_str = sample_values.astype(STRING_DTYPE).str.strip()
+            id_lengths = sample_str[sample_str.str.match(GENERAL_ID_PATTERN)].str.len()
+            id_like_count = len(id_lengths)
+            regular_id_like_count = int((id_lengths == 9).sum())
+            military_like_count = int((id_lengths <= 8).sum())
             
             # If more than 60% of values look like IDs
             if id_like_count >= len(sample_values) * 0.6 and id_like_count >= 3:
@@ -546,6 +609,9 @@ class ColumnNormalizer:
             print(f"\n🔧 FIXING MISPLACED ID DATA:")
             print("=" * 50)
             
+            # Cells are moved in place below, so work on a copy of the caller's frame
+            df = df.copy()
+            
             for col, id_count, total, target_type in problematic_columns:
                 print(f"  Column '{col}' contains {id_count}/{total} ID-like values")
                 
@@ -553,16 +619,18 @@ class ColumnNormalizer:
                 if target_type in df.columns:
                     print(f"  → Merging '{col}' data into '{target_type}' column")
                     
-                    # Merge the ID data
-                    for idx in df.index:
-                        current_id = df.loc[idx, target_type]
-                        misplaced_id = df.loc[idx, col]
-                        
-                        if pd.notna(misplaced_id) and general_id_pattern.match(str(misplaced_id).strip()):
-                            if pd.isna(current_id) or str(current_id).strip() == '':
-                                # Target column is empty, move the misplaced ID
-                                df.loc[idx, target_type] = str(misplaced_id).strip()
-                                df.loc[idx, col] = None
+                    # Merge the ID data: move ID-like values whose target cell is empty,
+                    # using vectorized masks over both columns
+                    misplaced_ids = df[col].astype(STRING_DTYPE).str.strip()
+                    current_ids = df[target_type].astype(STRING_DTYPE).str.strip()
+                    move_mask = (misplaced_ids.str.match(GENERAL_ID_PATTERN) &
+                                 (current_ids.isna() | (current_ids == ''))).fillna(False)
+                    rows_to_move = df.index[move_mask.to_numpy(dtype=bool)].tolist()
+                    moved_ids = misplaced_ids[move_mask].tolist()
+                    
+                    if rows_to_move:
+                        df.loc[rows_to_move, target_type] = moved_ids
+                        df.loc[rows_to_move, col] = None
                 else:
                     # No target column exists, rename this column
                     print(f"  → Renaming '{col}' to '{target_type}'")
@@ -583,42 +651,27 @@ class ColumnNormalizer:
                 continue
             
             # Check if this column name looks like data content
-            is_data = False
-            
-            # Pattern 1: Date patterns
-            if (re.match(r'\d{1,2}/\d{1,2}/\d{2,4}', col_str) or 
-                re.match(r'\d{4}-\d{2}-\d{2}', col_str) or
-                re.match(r'\d{1,2}\.\d{1,2}\.\d{2,4}', col_str)):
-                is_data = True
-            
-            # Pattern 2: ID numbers (7+ digits)
-            elif re.match(r'^\d{7,12}$', col_str):
-                is_data = True
-            
-            # Pattern 3: Phone numbers
-            elif (re.match(r'^\d{3}-\d{3}-\d{4}$', col_str) or 
-                  re.match(r'^\d{10}$', col_str)):
-                is_data = True
-            
-            # Pattern 4: Multiple names (Hebrew or English)
-            elif len(re.findall(r'[\u0590-\u05FF]+', col_str)) >= 3:
+            # (cheap checks first; the word count only runs if nothing matched)
+            # Very long text (likely content)
+            if len(col_str) > 30:
                 is_data = True
             
-            # Pattern 5: Hebrew "and" indicating multiple names
-            elif 'ו' in col_str and len(re.findall(r'[\u0590-\u05FF]+', col_str)) >= 2:
+            # Contains separators with meaningful content
+            elif ('|' in col_str or ',' in col_str) and len(col_str) > 10:
                 is_data = True
             
-            # Pattern 6: Very long text (likely content)
-            elif len(col_str) > 30:
+            # OCR artifacts
+            elif any(artifact in col_str for artifact in OCR_ARTIFACTS):
                 is_data = True
             
-            # Pattern 7: Contains separators with meaningful content
-            elif ('|' in col_str or ',' in col_str) and len(col_str) > 10:
+            # Dates, ID numbers (7+ digits) and phone numbers
+            elif DATA_HEADER_PATTERN.match(col_str):
                 is_data = True
             
-            # Pattern 8: OCR artifacts
-            elif any(artifact in col_str for artifact in ['V(PINVIS', 'Nd DOIS', 'Good Neutral']):
-                is_data = True
+            else:
+                # Multiple names (Hebrew or English), or Hebrew "and" indicating multiple names
+                hebrew_count = len(HEBREW_WORD_PATTERN.findall(col_str))
+                is_data = hebrew_count >= 3 or ('ו' in col_str and hebrew_count >= 2)
             
             if is_data:
                 columns_to_remove.append(col)
@@ -637,19 +690,32 @@ class ColumnNormalizer:
     
     def filter_low_quality_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """Remove columns with very little meaningful data"""
+        columns_to_remove = self.low_quality_columns_to_remove(df)
+        return df.drop(columns=columns_to_remove) if columns_to_remove else df
+    
+    def low_quality_columns_to_remove(self, df: pd.DataFrame, skip=frozenset()) -> List[str]:
+        """Report and return the columns with very little meaningful data"""
         columns_to_remove = []
+        meaningful_counts = {}
         total_rows = len(df)
         
-        for col in df.columns:
-            if col == 'Source File':
+        # Convert the frame to strings once so each column is counted with
+        # vectorized string operations instead of a loop over its values
+        values = df.astype(STRING_DTYPE)
+        duplicated = df.columns.duplicated(keep=False)
+        
+        for position, col in enumerate(df.columns):
+            if col == 'Source File' or col in skip:
                 continue
             
             # Count non-null, non-empty values
-            meaningful_values = 0
-            for val in df[col].dropna():
-                val_str = str(val).strip()
-                if val_str and val_str != '':
-                    meaningful_values += 1
+            if duplicated[position]:
+                # A repeated name selects all of its columns, so it keeps the per-value count
+                meaningful_values = sum(1 for val in df[col].dropna() if str(val).strip())
+            else:
+                meaningful_values = int(values.iloc[:, position].str.strip().ne('').sum())
+            
+            meaningful_counts[col] = meaningful_values
             
             # Remove columns with very low data density (less than 5% meaningful data)
             if total_rows > 100 and meaningful_values < (total_rows * 0.05):
@@ -662,17 +728,17 @@ class ColumnNormalizer:
             print(f"\n🧹 REMOVING LOW-QUALITY COLUMNS:")
             print("=" * 50)
             for col in columns_to_remove:
-                meaningful_count = sum(1 for val in df[col].dropna() if str(val).strip())
-                print(f"  Removing '{col}' (only {meaningful_count} meaningful values)")
+                print(f"  Removing '{col}' (only {meaningful_counts[col]} meaningful values)")
             
-            df = df.drop(columns=columns_to_remove)
             print(f"  → Removed {len(columns_to_remove)} low-quality columns")
         
-        return df
+        return columns_to_remove
     
     def normalize_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         """Normalize DataFrame by merging duplicate columns"""
-        df_normalized = df.copy()
+        # No up-front copy: every step below returns a new frame, and the steps
+        # that modify cells or headers copy (or drop) before doing so
+        df_normalized = df
         
         # First, remove columns that are clearly data promoted to headers
         df_normalized = self.filter_data_promoted_columns(df_normalized)
@@ -683,14 +749,14 @@ class ColumnNormalizer:
         # Then, detect and fix Excel headers where real headers are in first data row
         df_normalized = self.detect_and_fix_excel_headers(df_normalized)
         
-        # Then, filter out remaining Excel column names
-        df_normalized = self.filter_excel_column_names(df_normalized)
-        
-        # Filter out empty/unnamed columns with no useful data
-        df_normalized = self.filter_empty_columns(df_normalized)
-        
-        # Filter out columns with very little meaningful data
-        df_normalized = self.filter_low_quality_columns(df_normalized)
+        # Then, filter out remaining Excel column names, empty/unnamed columns with
+        # no useful data and columns with very little meaningful data. Each check
+        # only looks at its own column, so they are collected and dropped at once.
+        columns_to_remove = self.excel_name_columns_to_remove(df_normalized)
+        columns_to_remove += self.empty_columns_to_remove(df_normalized, skip=set(columns_to_remove))
+        columns_to_remove += self.low_quality_columns_to_remove(df_normalized, skip=set(columns_to_remove))
+        if columns_to_remove:
+            df_normalized = df_normalized.drop(columns=columns_to_remove)
         
         # Detect and fix misplaced ID data
         df_normalized = self.fix_misplaced_id_data(df_normalized)
@@ -714,17 +780,16 @@ class ColumnNormalizer:
                 for col in overlap:
                     sample_values = df_normalized[col].dropna().head(10)
                     if len(sample_values) > 0:
+                        # Strip the sample once; the integer and length checks below are
+                        # vectorized string operations on it. list() walks the values of a
+                        # column (or the labels of a duplicated name's columns, as before).
+                        sample_str = pd.Series(list(sample_values), dtype=object).astype(STRING_DTYPE).str.strip()
+                        
                         # Check if values are sequential numbers (1, 2, 3, ...) - indicates row numbers
-                        values_list = []
-                        for val in sample_values:
-                            try:
-                                num_val = int(str(val).strip())
-                                values_list.append(num_val)
-                            except (ValueError, AttributeError):
-                                continue
+                        values_list = [int(val) for val in sample_str[sample_str.str.fullmatch(INTEGER_PATTERN)]]
                         
                         if len(values_list) >= 3:
-                            is_sequential = all(values_list[i] == values_list[0] + i for i in range(len(values_list)))
+                            is_sequential = all(b - a == 1 for a, b in zip(values_list, values_list[1:]))
                             starts_with_low_number = values_list[0] <= 5  # Starts with 1, 2, 3, 4, or 5
                             max_value = max(values_list) if values_list else 0
                             has_reasonable_range = max_value <= 100  # Row numbers usually don't exceed 100
@@ -736,7 +801,7 @@ class ColumnNormalizer:
                                 continue
                         
                         # Check if values look like actual IDs (7+ digits, not sequential)
-                        long_id_count = sum(1 for val in sample_values if len(str(val).strip()) >= 7)
+                        long_id_count = int((sample_str.str.len() >= 7).sum())
                         if long_id_count >= len(sample_values) * 0.8:  # 80% are long numbers
                             print(f"  → '{col}' appears to be actual IDs (long numbers)")
                             # Remove from Row Number category, keep in ID
@@ -766,22 +831,31 @@ class ColumnNormalizer:
                 # Filter to only existing columns
                 existing_columns = [col for col in found_columns if col in df_normalized.columns]
                 
-                for idx in df_normalized.index:
-                    values = []
+                # Strip each column with vectorized string operations and treat empty
+                # strings as missing (columns may have been renamed away by an earlier mapping)
+                if existing_columns:
+                    stripped_columns = []
                     for col in existing_columns:
-                        val = df_normalized.loc[idx, col]
-                        if pd.notna(val) and str(val).strip():
-                            values.append(str(val).strip())
+                        values = df_normalized[col].astype(STRING_DTYPE).str.strip()
+                        stripped_columns.append(values.mask(values.eq('')))
                     
-                    if values:
-                        # If multiple non-null values exist, prefer the first one
-                        # or combine them if they're different
-                        unique_values = list(set(values))
-                        if len(unique_values) == 1:
-                            merged_series.loc[idx] = unique_values[0]
-                        else:
-                            # Multiple different values - combine them
-                            merged_series.loc[idx] = " | ".join(unique_values)
+                    # If multiple non-null values exist, prefer the first one
+                    # or combine them if they're different
+                    first_values = stripped_columns[0]
+                    for values in stripped_columns[1:]:
+                        first_values = first_values.fillna(values)
+                    has_other_value = np.zeros(len(first_values), dtype=bool)
+                    for values in stripped_columns[1:]:
+                        has_other_value |= values.ne(first_values).fillna(False).to_numpy(dtype=bool)
+                    merged_series = first_values.astype(object).where(first_values.notna(), merged_series)
+                    
+                    # Multiple different values - combine them (only these rows are walked in Python)
+                    if has_other_value.any():
+                        conflicting_rows = zip(*(values[has_other_value].tolist() for values in stripped_columns))
+                        merged_series[has_other_value] = [
+                            " | ".join(list(set(val for val in row_values if val is not pd.NA)))
+                            for row_values in conflicting_rows
+                        ]
                 
                 # Remove the original columns FIRST (before adding the new one with potentially same name)
                 columns_to_drop = [col for col in existing_columns if col in df_normalized.columns and col != normalized_name]
@@ -802,27 +876,11 @@ class ColumnNormalizer:
                     df_normalized = df_normalized.rename(columns={old_name: normalized_name})
                     print(f"Renamed: '{old_name}' → '{normalized_name}'")
         
-        # Reorder columns with Source File first, then normalized columns
-        column_order = []
-        if 'Source File' in df_normalized.columns:
-            column_order.append('Source File')
-        
-        # Add normalized columns in a logical order
-        preferred_order = [
-            'ID', 'First Name', 'Last Name', 'Employee Number', 
-            'Title/Position', 'Date of Birth', 'Nationality', 'Phone Number',
-            'Product Description', 'Quantity', 'Price', 'Supply Date',
-            'Row Number', 'Balance', 'Signature'
-        ]
-        
-        for col in preferred_order:
-            if col in df_normalized.columns and col not in column_order:
-                column_order.append(col)
-        
-        # Add any remaining columns that weren't in the preferred order
-        for col in df_normalized.columns:
-            if col not in column_order:
-                column_order.append(col)
+        # Reorder columns with Source File first, then normalized columns in a
+        # logical order, then any remaining columns that weren't in the preferred order
+        existing_columns = df_normalized.columns
+        leading_columns = [col for col in PREFERRED_COLUMN_ORDER if col in existing_columns]
+        column_order = list(dict.fromkeys(leading_columns + list(existing_columns)))
         
         # Reorder columns
         df_normalized = df_normalized[column_order]
@@ -877,41 +935,53 @@ class ColumnNormalizer:
         moved_count = 0
         replaced_count = 0
         
-        for idx in df.index:
-            emp_num = df.loc[idx, 'Employee Number']
-            current_id = df.loc[idx, 'ID']
+        # Strip the Employee Numbers once and make every check a vectorized mask
+        # (the ID column is only read if some Employee Number qualifies)
+        if not df.empty:
+            emp_values = df['Employee Number'].astype(STRING_DTYPE).str.strip()
             
             # Check if Employee Number exists and is longer than 7 chars
-            if pd.notna(emp_num) and len(str(emp_num).strip()) > 7:
-                emp_num_clean = str(emp_num).strip()
-                
-                # Check if this looks like a valid ID (numeric, reasonable length)
-                # Handle cases with slashes (like "02/911490")
-                emp_num_digits_only = ''.join(c for c in emp_num_clean if c.isdigit())
-                
-                if (emp_num_clean.isdigit() or 
-                    (emp_num_clean.startswith('A') and len(emp_num_clean) <= 12) or
-                    ('/' in emp_num_clean and len(emp_num_digits_only) >= 7)):
-                    
-                    if pd.isna(current_id) or str(current_id).strip() == '':
-                        # ID is empty - just move it
-                        df.loc[idx, 'ID'] = emp_num_clean
-                        df.loc[idx, 'Employee Number'] = None
-                        moved_count += 1
-                    else:
-                        # ID has data - check if current ID looks corrupted/invalid
-                        current_id_str = str(current_id).strip()
-                        
-                        # Replace if current ID looks invalid (contains spaces, special chars, etc.)
-                        if (len(current_id_str) < 6 or  # Too short for ID
-                            ' ' in current_id_str or    # Contains spaces
-                            any(c in current_id_str for c in ['/', '(', ')', "'", ',', 'j', 'H', 'O', 'D', 'S', 'N']) or  # Contains obvious OCR errors
-                            not any(c.isdigit() for c in current_id_str)):  # No digits at all
-                            
-                            print(f"    Replacing invalid ID '{current_id_str}' with '{emp_num_clean}'")
-                            df.loc[idx, 'ID'] = emp_num_clean
-                            df.loc[idx, 'Employee Number'] = None
-                            replaced_count += 1
+            is_candidate = (emp_values.str.len() > 7).fillna(False)
+            
+            # Check if this looks like a valid ID (numeric, reasonable length)
+            # Handle cases with slashes (like "02/911490")
+            is_valid = (emp_values.str.isdigit() |
+                        (emp_values.str.startswith('A') & (emp_values.str.len() <= 12))).fillna(False)
+            has_slash = is_candidate & ~is_valid & emp_values.str.contains('/', regex=False).fillna(False)
+            if has_slash.any():
+                is_valid[has_slash] = emp_values[has_slash].map(
+                    lambda emp_num_clean: sum(c.isdigit() for c in emp_num_clean) >= 7).astype(bool)
+            is_candidate &= is_valid
+        
+        if not df.empty and is_candidate.any():
+            current_ids = df['ID'].astype(STRING_DTYPE).str.strip()
+            
+            # ID is empty - just move it
+            id_empty = (current_ids.isna() | (current_ids == '')).fillna(True)
+            to_move = is_candidate & id_empty
+            
+            # ID has data - replace it if it looks invalid (too short, contains spaces,
+            # obvious OCR errors or no digits at all)
+            to_check = is_candidate & ~id_empty
+            to_replace = to_check & (
+                (current_ids.str.len() < 6) |
+                current_ids.str.contains(' ', regex=False) |
+                current_ids.str.contains(r"[/()',jHODSN]")
+            ).fillna(False)
+            no_digits = to_check & ~to_replace
+            if no_digits.any():
+                to_replace[no_digits] = current_ids[no_digits].map(
+                    lambda current_id_str: not any(c.isdigit() for c in current_id_str)).astype(bool)
+            
+            for current_id_str, emp_num_clean in zip(current_ids[to_replace], emp_values[to_replace]):
+                print(f"    Replacing invalid ID '{current_id_str}' with '{emp_num_clean}'")
+            
+            rows_to_update = (to_move | to_replace).to_numpy(dtype=bool)
+            if rows_to_update.any():
+                df.loc[rows_to_update, 'ID'] = emp_values[rows_to_update].tolist()
+                df.loc[rows_to_update, 'Employee Number'] = None
+            moved_count = int(to_move.sum())
+            replaced_count = int(to_replace.sum())
         
         if moved_count > 0:
             print(f"  → Moved {moved_count} Employee Numbers to empty ID fields")
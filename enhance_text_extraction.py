@@ -4,39 +4,81 @@ Enhanced text pattern extraction for documents where Azure didn't detect tables
 but the text contains structured data that can be parsed into tables
 """
 
-import json
 import os
 import re
 import sys
+import multiprocessing
 from collections import defaultdict
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from excel_io import read_excel
+from json_io import dump_json
+from extract_final_table import extract_final_table
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+# RE2 spellings of Python's Unicode \d, \w and \s (RE2's own are ASCII-only)
+RE2_CLASSES = {'d': r'\p{Nd}', 'w': r'\pL\pN_', 's': r'\t\n\v\f\r\x1c-\x1f\x85\pZ'}
+RE2_ESCAPE_PATTERN = re.compile(r'\\u[0-9A-Fa-f]{4}|\\[dws]')
+RE2_TOKEN_PATTERN = re.compile(r'\[[^\]]*\]|' + RE2_ESCAPE_PATTERN.pattern)
+
+def to_re2_pattern(pattern):
+    """Rewrite a Python regex so RE2 matches the same Unicode characters"""
+    def translate(token, in_class):
+        if token.startswith('['):
+            return RE2_ESCAPE_PATTERN.sub(lambda match: translate(match.group(0), True), token)
+        if token.startswith('\\u'):
+            return r'\x{%s}' % token[2:]
+        char_class = RE2_CLASSES[token[1]]
+        return char_class if in_class else f'[{char_class}]'
+    return RE2_TOKEN_PATTERN.sub(lambda match: translate(match.group(0), False), pattern)
+
+def compile_pattern(pattern):
+    """Compile a multiline pattern with RE2 (linear time, no backtracking) when it is installed"""
+    if re2 is not None:
+        return re2.compile('(?m)' + to_re2_pattern(pattern))
+    return re.compile(pattern, re.MULTILINE)
+
+# Structured text patterns that can be converted to tables, compiled once
+STRUCTURED_PATTERNS = {
+    'list_with_id': {
+        'pattern': compile_pattern(r'(\d+)\s+([\u0590-\u05FF\s\w.-]+?)\s+([\d-]+)\s+(\d{7,10})'),
+        'headers': ['Row Number', 'Name', 'Phone', 'ID'],
+        'description': 'Numbered list with Hebrew names, phone numbers, and ID numbers'
+    },
+    'name_phone_id': {
+        'pattern': compile_pattern(r'([\u0590-\u05FF\s\w.-]+?)\s+([\d-]+)\s+(\d{7,10})'),
+        'headers': ['Name', 'Phone', 'ID'],
+        'description': 'Names with phone numbers and ID numbers'
+    },
+    'id_name_pattern': {
+        'pattern': compile_pattern(r'(\d{7,10})\s+([\u0590-\u05FF\s\w.-]+)'),
+        'headers': ['ID', 'Name'],
+        'description': 'ID numbers followed by names'
+    }
+}
+
+# Seconds each recovered file's final table extraction may run before it is killed
+EXTRACTION_TIMEOUT = 30
+
+# Every structured pattern match contains a 7-10 digit ID, so a text can't have more
+# matches of any pattern than non-overlapping 7-digit runs
+ID_DIGITS_PATTERN = compile_pattern(r'\d{7}')
 
 def detect_structured_patterns(text_content):
     """
     Detect structured patterns in text that could be converted to tables
     """
-    patterns = {
-        'list_with_id': {
-            'pattern': r'(\d+)\s+([\u0590-\u05FF\s\w.-]+?)\s+([\d-]+)\s+(\d{7,10})',
-            'headers': ['Row Number', 'Name', 'Phone', 'ID'],
-            'description': 'Numbered list with Hebrew names, phone numbers, and ID numbers'
-        },
-        'name_phone_id': {
-            'pattern': r'([\u0590-\u05FF\s\w.-]+?)\s+([\d-]+)\s+(\d{7,10})',
-            'headers': ['Name', 'Phone', 'ID'],
-            'description': 'Names with phone numbers and ID numbers'
-        },
-        'id_name_pattern': {
-            'pattern': r'(\d{7,10})\s+([\u0590-\u05FF\s\w.-]+)',
-            'headers': ['ID', 'Name'],
-            'description': 'ID numbers followed by names'
-        }
-    }
-    
     detected_patterns = []
     
-    for pattern_name, pattern_info in patterns.items():
-        matches = re.findall(pattern_info['pattern'], text_content, re.MULTILINE)
+    # Skip the pattern scans when there aren't enough ID numbers for 3 matches
+    if len(ID_DIGITS_PATTERN.findall(text_content)) < 3:
+        return detected_patterns
+    
+    for pattern_name, pattern_info in STRUCTURED_PATTERNS.items():
+        matches = pattern_info['pattern'].findall(text_content)
         if len(matches) >= 3:  # At least 3 matches to consider it a pattern
             detected_patterns.append({
                 'name': pattern_name,
@@ -73,8 +115,9 @@ def convert_pattern_to_table(pattern_data):
 def process_no_table_files():
     """Process files that were marked as having no tables"""
     
-    # Read the Excel file to get files with "No table data extracted"
-    df = pd.read_excel('excel_results/ocr_results.xlsx')
+    # Read the Excel file to get files with "No table data extracted" (only the
+    # two columns used here are parsed)
+    df = read_excel('excel_results/ocr_results.xlsx', usecols=['Error', 'Source File'])
     no_table_files = df[df['Error'] == 'No table data extracted']['Source File'].unique()
     
     print(f"Found {len(no_table_files)} files with 'No table data extracted'")
@@ -82,17 +125,21 @@ def process_no_table_files():
     
     recovered_files = []
     
+    # Index the OCR text files once by the base name they were saved under
+    # ({base_name}-{hash}_ocr_results.txt)
+    text_files_by_base = defaultdict(list)
+    for txt_file in os.listdir('txt_result'):
+        if txt_file.endswith('_ocr_results.txt'):
+            text_files_by_base[txt_file.rsplit('-', 1)[0]].append(txt_file)
+    
     for i, source_file in enumerate(no_table_files[:50]):  # Process first 50
         print(f"Processing {i+1}/50: {source_file}")
         
-        # Find the corresponding OCR text file
-        base_name = source_file.replace('.docx', '').replace('.pdf', '').replace('.png', '').replace('.jpg', '')
+        # Find the corresponding OCR text file (named like sample_analyze_read.py does)
+        base_name = os.path.splitext(source_file)[0]
         
         # Find matching text files
-        matching_text_files = []
-        for txt_file in os.listdir('txt_result'):
-            if txt_file.startswith(base_name) and txt_file.endswith('_ocr_results.txt'):
-                matching_text_files.append(txt_file)
+        matching_text_files = text_files_by_base.get(base_name, [])
         
         if matching_text_files:
             txt_path = f"txt_result/{matching_text_files[0]}"
@@ -101,14 +148,13 @@ def process_no_table_files():
                     text_content = f.read()
                 
                 # Extract only the document content (before analysis section)
-                if "----Analyzing Read from page" in text_content:
-                    document_content = text_content.split("----Analyzing Read from page")[0]
-                else:
-                    document_content = text_content
+                document_content = text_content.partition("----Analyzing Read from page")[0]
                 
-                # Remove "Document contains content:" prefix if present
-                if "Document contains content:" in document_content:
-                    document_content = document_content.split("Document contains content:")[1]
+                # Remove "Document contains content:" prefix if present (partition
+                # slices around the markers without splitting the whole text)
+                _, marker, after = document_content.partition("Document contains content:")
+                if marker:
+                    document_content = after.partition("Document contains content:")[0]
                 
                 # Detect patterns
                 patterns = detect_structured_patterns(document_content.strip())
@@ -127,8 +173,7 @@ def process_no_table_files():
                     output_file = f"json_result/{base_name}-{hash_part}_recovered_table.json"
                     
                     # Save the recovered table
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        json.dump([table_data], f, ensure_ascii=False, indent=2)
+                    dump_json([table_data], output_file)
                     
                     recovered_files.append({
                         'source_file': source_file,
@@ -164,30 +209,62 @@ def process_no_table_files():
     
     return recovered_files
 
+def _extract_in_child(output_file, sender):
+    """Child process body: run the extraction quietly and send back the failure, if any"""
+    try:
+        if extract_final_table(output_file, verbose=False):
+            sender.send(None)
+        else:
+            sender.send(f"Final extraction failed: no table extracted from {output_file}")
+    except Exception as e:
+        sender.send(f"Error during final extraction: {e}")
+    finally:
+        sender.close()
+
+def extract_with_timeout(output_file, timeout=EXTRACTION_TIMEOUT):
+    """Run extract_final_table on one file in its own process, killing it after timeout seconds
+    
+    Returns None on success, otherwise the failure message.
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_extract_in_child, args=(output_file, sender))
+    process.start()
+    sender.close()
+    
+    process.join(timeout)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+        return f"Final extraction failed: timed out after {timeout} seconds"
+    
+    if receiver.poll():
+        return receiver.recv()
+    return f"Final extraction failed: worker exited with code {process.exitcode}"
+
 def run_extraction_on_recovered_files(recovered_files):
     """Run the final table extraction on recovered files"""
     print("Running final table extraction on recovered files...\n")
     
     successful_extractions = 0
     
-    for file_info in recovered_files:
-        print(f"Processing: {file_info['source_file']}")
+    # Each file is extracted in its own process (so a hung extraction can be killed,
+    # as the old per-file subprocess timeout did); threads only wait on those
+    # processes. Results are reported in the original order, without the
+    # extractor's own report.
+    max_workers = max(1, min(len(recovered_files), os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(extract_with_timeout, file_info['output_file'])
+                   for file_info in recovered_files]
         
-        try:
-            # Run the extract_final_table script
-            import subprocess
-            result = subprocess.run([
-                'python3', 'extract_final_table.py', file_info['output_file']
-            ], capture_output=True, text=True, timeout=30)
+        for file_info, future in zip(recovered_files, futures):
+            print(f"Processing: {file_info['source_file']}")
             
-            if result.returncode == 0:
+            error = future.result()
+            if error is None:
                 print(f"  ✅ Successfully extracted final table")
                 successful_extractions += 1
             else:
-                print(f"  ❌ Final extraction failed: {result.stderr.strip()}")
-                
-        except Exception as e:
-            print(f"  ❌ Error during final extraction: {e}")
+                print(f"  ❌ {error}")
     
     print(f"\nFinal extraction completed: {successful_extractions}/{len(recovered_files)} successful")
 
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Excel file helpers for the result-checking scripts
+Reads with the calamine engine when python-calamine is installed and falls
+back to pandas' default reader otherwise
+"""
+
+import pandas as pd
+
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+def read_excel(path, **kwargs):
+    """Read an Excel sheet into a DataFrame"""
+    if python_calamine is not None:
+        try:
+            return pd.read_excel(path, engine='calamine', **kwargs)
+        except ValueError as e:
+            # pandas older than 2.2 does not know the calamine engine
+            if 'calamine' not in str(e):
+                raise
+    return pd.read_excel(path, **kwargs)
@@ -4,86 +4,157 @@ Extract final table with custom column order and clean up temp files
 Usage: python3 extract_final_table.py <tables.json> [--cleanup]
 """
 
-import json
 import sys
 import os
 import re
+import string
+from collections import Counter
+from operator import itemgetter
+from json_io import load_json, dump_json
 
-def is_excel_ui_row(row):
+# Israeli ID patterns (9 digits with optional spaces/separators)
+SPACED_ID_PATTERN = re.compile(r'^\d{2,3}\s*\d{5,6}$')  # e.g., "255 87932"
+ID_SEPARATORS_TABLE = str.maketrans('', '', '-/ ')  # Deletes separators inside IDs
+
+# A line holding just an ID number in collapsed tables
+ID_LINE_PATTERN = re.compile(r'^\d{7,10}$')
+
+# A collapsed-table record: an ID line followed by first and last name lines (a
+# trailing row number line needs no skipping, it can never be taken for an ID)
+COLLAPSED_RECORD_PATTERN = re.compile(r'^(\d{7,10})$(?:\n(.*))?(?:\n(.*))?', re.MULTILINE)
+
+# Hebrew/English text followed by a 9+ digit number (name + ID in one cell)
+EMBEDDED_ID_PATTERN = re.compile(r'[\u0590-\u05FFa-zA-Z\s]+\d{8,}')
+
+# Common title/metadata patterns
+TITLE_PATTERNS = (
+    re.compile(r'[\u05d8][\u05f4\u05f3]\d+'),  # Hebrew abbreviation + number (like ט׳2)
+    re.compile(r'\w+\s+\w+\s+\w+'),  # 3+ words (likely a name or title)
+    re.compile(r'\d{1,2}\.\d{1,2}\.\d{2,4}'),  # Date pattern
+)
+
+# Excel UI elements ('selected' also covers ':selected:', 'unselected' and ':unselected:')
+EXCEL_UI_INDICATORS = ('formula bar', 'selected', 'column_', 'row_', 'cell_', 'sheet', 'workbook')
+
+# Excel column names (A, B, C, D, etc.), lowercased
+EXCEL_COLUMN_NAMES = frozenset(string.ascii_lowercase)  # a-z
+
+# Common header patterns
+HEADER_INDICATORS = (
+    'id', 'תז', 'ת.ז', 'מספר', 'first', 'last', 'שם פרטי', 'שם משפחה',
+    'name', 'employee', 'עובד', 'חתימה', 'signature'
+)
+
+# Words that make a row look like it holds headers rather than a title or data
+HEADER_WORDS = (
+    'id', 'name', 'שם', 'ת.ז', 'תז', 'ת״ז', 'מספר', 'זהות', 'first', 'last',
+    'תפקיד', 'position', 'משפחה', 'מגורים'
+)
+
+def quiet_print(*args, **kwargs):
+    """Stands in for print() when a caller passes verbose=False"""
+
+def reorder_rows(rows, new_order):
+    """Reorder the cells of every row by column index, using '' for cells a short row lacks"""
+    if not new_order:
+        return [[] for _ in rows]
+    last_col = max(new_order)
+    if len(new_order) == 1:
+        return [[row[last_col]] if len(row) > last_col else [''] for row in rows]
+    # Every row is gathered in one C-level itemgetter call; short rows are padded
+    # once first instead of bounds-checking each column
+    get_cells = itemgetter(*new_order)
+    width = last_col + 1
+    return [list(get_cells(row if len(row) >= width else list(row) + [''] * (width - len(row))))
+            for row in rows]
+
+def lowered_cells(row):
+    """Lowercased, stripped text of each cell, shared by the row checks below"""
+    return [str(cell).lower().strip() for cell in row]
+
+def is_excel_ui_row(row, cells=None):
     """Check if a row contains Excel UI elements that shouldn't be headers"""
     if not row:
         return False
     
-    excel_ui_indicators = [
-        'formula bar', 'selected', ':selected:', 'unselected', ':unselected:',
-        'column_', 'row_', 'cell_', 'sheet', 'workbook'
-    ]
-    
-    # Check for Excel column names (A, B, C, D, etc.)
-    excel_columns = [chr(i) for i in range(ord('A'), ord('Z')+1)]  # A-Z
-    
-    for cell in row:
-        cell_str = str(cell).lower().strip()
-        
-        # Check for Excel UI elements
-        if any(indicator in cell_str for indicator in excel_ui_indicators):
-            return True
-            
+    for cell_str in (lowered_cells(row) if cells is None else cells):
         # Check for single letter columns (A, B, C, etc.)
-        if cell_str in [col.lower() for col in excel_columns]:
+        if cell_str in EXCEL_COLUMN_NAMES:
             return True
-            
-        # Check for Excel UI patterns like "First Name\n:selected:"
-        if ':selected:' in cell_str or ':unselected:' in cell_str:
+        
+        # Check for Excel UI elements, including patterns like "First Name\n:selected:"
+        if any(indicator in cell_str for indicator in EXCEL_UI_INDICATORS):
             return True
     
     return False
 
-def is_header_row(row):
+def is_header_row(row, cells=None):
     """Determine if a row looks like headers or data"""
     if not row:
         return False
     
+    if cells is None:
+        cells = lowered_cells(row)
+    
     # First check if this is an Excel UI row (definitely not headers)
-    if is_excel_ui_row(row):
+    if is_excel_ui_row(row, cells):
         return False
     
-    # Check for common header patterns
-    header_indicators = [
-        'id', 'תז', 'ת.ז', 'מספר', 'first', 'last', 'שם פרטי', 'שם משפחה', 
-        'name', 'employee', 'עובד', 'חתימה', 'signature'
-    ]
-    
     valid_headers = 0
-    for cell in row:
-        cell_str = str(cell).lower().strip()
-        if any(indicator in cell_str for indicator in header_indicators):
-            valid_headers += 1
-        elif cell_str and len(cell_str) > 8 and cell_str.isdigit():
-            # Long numeric values are likely data, not headers
+    for cell_str in cells:
+        if len(cell_str) > 8 and cell_str.isdigit():
+            # Long numeric values are likely data, not headers (no indicator is all digits)
             return False
+        if any(indicator in cell_str for indicator in HEADER_INDICATORS):
+            valid_headers += 1
     
     # If most cells look like headers, it's probably a header row
     return valid_headers >= max(1, len(row) // 2)
 
+def has_header_like_content(row, cells=None):
+    """Check if a row contains header-like content"""
+    if cells is None:
+        cells = lowered_cells(row)
+    for val, val_str in zip(row, cells):
+        if val and any(word in val_str for word in HEADER_WORDS):
+            return True
+    return False
+
+def is_title_or_metadata_row(row, max_cols):
+    """Check if row appears to be a title/metadata rather than table headers"""
+    if not row:
+        return False
+    
+    # If row has significantly fewer columns than expected, it might be a title
+    non_empty_count = sum(1 for val in row if val and str(val).strip())
+    if non_empty_count <= 1 and len(row) < max_cols:
+        return True
+    
+    # Check for common title/metadata patterns
+    for val in row:
+        if val and str(val).strip():
+            val_str = str(val).strip()
+            for pattern in TITLE_PATTERNS:
+                if pattern.match(val_str):
+                    return True
+    
+    return False
+
 def is_likely_id(value):
     """Check if a value looks like an ID"""
     if not value:
         return False
     val_str = str(value).strip()
+    if len(val_str) < 6:  # Shorter than any ID form below
+        return False
     
-    # Check for Israeli ID patterns (9 digits with optional spaces/separators)
-    import re
-    if re.match(r'^\d{2,3}\s*\d{5,6}$', val_str):  # e.g., "255 87932"
-        return True
-    if re.match(r'^\d{9}$', val_str):  # e.g., "123456789"
-        return True
-    if re.match(r'^\d{8,10}$', val_str):  # 8-10 digit IDs
+    # 6+ digits with optional separators (this also covers plain 8-10 digit IDs)
+    digits = val_str.translate(ID_SEPARATORS_TABLE)
+    if digits.isdigit() and len(digits) >= 6:
         return True
     
-    # Fallback to original logic
-    val_str = val_str.replace('-', '').replace('/', '').replace(' ', '')
-    return val_str.isdigit() and len(val_str) >= 6
+    # Check for Israeli ID patterns split by other whitespace (e.g., "255\t87932")
+    return bool(SPACED_ID_PATTERN.match(val_str))
 
 def contains_embedded_id(text):
     """Check if text contains an embedded ID (name + ID number)"""
@@ -91,13 +162,11 @@ def contains_embedded_id(text):
         return False
     text_str = str(text).strip()
     # Look for patterns like "הכהן קרנר 314905662" (name followed by ID)
-    import re
-    # Pattern: Hebrew/English text followed by a 9+ digit number
-    pattern = r'[\u0590-\u05FFa-zA-Z\s]+\d{8,}'
-    return bool(re.search(pattern, text_str))
+    return bool(EMBEDDED_ID_PATTERN.search(text_str))
 
-def detect_table_structure(rows):
+def detect_table_structure(rows, verbose=True):
     """Analyze table structure to find the best header row and data organization"""
+    log = print if verbose else quiet_print
     if not rows or len(rows) < 2:
         return 0, []
     
@@ -108,47 +177,44 @@ def detect_table_structure(rows):
     data_cols = len(rows[1]) if len(rows) > 1 else header_cols
     
     if header_cols != data_cols and len(rows) > 2:
-        print(f"⚠️  Column mismatch detected: Header={header_cols} cols, Data={data_cols} cols")
+        log(f"⚠️  Column mismatch detected: Header={header_cols} cols, Data={data_cols} cols")
         
         # If data rows have more columns than header, the table structure is wrong
         if data_cols > header_cols:
-            print(f"🔧 Data rows have more columns - reconstructing header row")
+            log(f"🔧 Data rows have more columns - reconstructing header row")
             
             # Check if first row contains embedded ID data (should be treated as data, not header)
             # Use module-level function
             first_row_has_embedded_ids = any(contains_embedded_id(val) for val in rows[0])
             
             if first_row_has_embedded_ids:
-                print(f"🔄 First row contains embedded IDs, treating as data: {rows[0]}")
+                log(f"🔄 First row contains embedded IDs, treating as data: {rows[0]}")
                 # Pad the first row to match data column count
-                padded_first_row = list(rows[0])
-                while len(padded_first_row) < data_cols:
-                    padded_first_row.append('')  # Add empty columns
+                padded_first_row = list(rows[0]) + [''] * (data_cols - len(rows[0]))  # Add empty columns
                 
                 # Insert this as a data row after creating proper headers
                 all_data_rows = [padded_first_row] + rows[1:]
             else:
                 all_data_rows = rows[1:]
             
-            # Analyze all data to create proper headers
+            # Analyze all data to create proper headers: count what type of data
+            # each column holds, classifying every cell of the first 6 data rows once
+            id_counts = [0] * data_cols
+            text_counts = [0] * data_cols
+            empty_counts = [0] * data_cols
+            
+            for row in all_data_rows[:6]:
+                for col_idx, cell in enumerate(row[:data_cols]):
+                    if not cell or str(cell).strip() == '':
+                        empty_counts[col_idx] += 1
+                    elif is_likely_id(cell):
+                        id_counts[col_idx] += 1
+                    elif str(cell).strip() and not str(cell).isdigit():
+                        text_counts[col_idx] += 1
+            
             corrected_headers = []
             
-            for col_idx in range(data_cols):
-                # Check what type of data is in this column across multiple rows
-                id_count = 0
-                text_count = 0
-                empty_count = 0
-                
-                for row in all_data_rows[:6]:  # Check first 6 data rows
-                    if col_idx < len(row):
-                        cell = row[col_idx]
-                        if not cell or str(cell).strip() == '':
-                            empty_count += 1
-                        elif is_likely_id(cell):
-                            id_count += 1
-                        elif str(cell).strip() and not str(cell).isdigit():
-                            text_count += 1
-                
+            for col_idx, (id_count, text_count, empty_count) in enumerate(zip(id_counts, text_counts, empty_counts)):
                 # Assign header based on data pattern
                 if id_count >= 3:  # Most values are IDs
                     corrected_headers.append('ID')
@@ -164,8 +230,8 @@ def detect_table_structure(rows):
                 else:
                     corrected_headers.append(f'Column_{col_idx+1}')
             
-            print(f"🔨 Corrected headers: {corrected_headers}")
-            print(f"📊 Total data rows including recovered: {len(all_data_rows)}")
+            log(f"🔨 Corrected headers: {corrected_headers}")
+            log(f"📊 Total data rows including recovered: {len(all_data_rows)}")
             
             # Rebuild the rows array with corrected headers and all data
             rows[:] = [corrected_headers] + all_data_rows
@@ -175,82 +241,45 @@ def detect_table_structure(rows):
     first_row = rows[0]
     first_row_has_ids = any(is_likely_id(val) for val in first_row)
     
-    # Also check if first row has header-like content
-    def has_header_like_content(row):
-        """Check if a row contains header-like content"""
-        header_words = ['id', 'name', 'שם', 'ת.ז', 'תז', 'ת״ז', 'מספר', 'זהות', 'first', 'last', 'תפקיד', 'position', 'משפחה', 'מגורים']
-        for val in row:
-            if val:
-                val_str = str(val).strip().lower()
-                for word in header_words:
-                    if word in val_str:
-                        return True
-        return False
-    
-    
-    def is_title_or_metadata_row(row, max_cols):
-        """Check if row appears to be a title/metadata rather than table headers"""
-        if not row:
-            return False
-        
-        # If row has significantly fewer columns than expected, it might be a title
-        non_empty_count = sum(1 for val in row if val and str(val).strip())
-        if non_empty_count <= 1 and len(row) < max_cols:
-            return True
-        
-        # Check for common title/metadata patterns
-        title_patterns = [
-            r'[\u05d8][\u05f4\u05f3]\d+',  # Hebrew abbreviation + number (like ט׳2)
-            r'\w+\s+\w+\s+\w+',  # 3+ words (likely a name or title)
-            r'\d{1,2}\.\d{1,2}\.\d{2,4}',  # Date pattern
-        ]
-        
-        for val in row:
-            if val and str(val).strip():
-                val_str = str(val).strip()
-                for pattern in title_patterns:
-                    if re.match(pattern, val_str):
-                        return True
-        
-        return False
+    # The header checks below only look at the first 5 rows; lowercase their cells once
+    early_row_cells = [lowered_cells(row) for row in rows[:5]]
     
     # Find the expected column count by looking at the most common row length
     if len(rows) > 3:
-        row_lengths = [len(row) for row in rows[1:]]
-        from collections import Counter
-        most_common_length = Counter(row_lengths).most_common(1)[0][0]
-        print(f"📊 Expected column count based on data rows: {most_common_length}")
+        row_lengths = Counter(len(row) for row in rows[1:])
+        most_common_length = max(row_lengths, key=row_lengths.get)  # First seen wins ties
+        log(f"📊 Expected column count based on data rows: {most_common_length}")
     else:
         most_common_length = len(rows[1]) if len(rows) > 1 else len(rows[0])
     
     # Check if any cell in first row contains embedded IDs
     first_row_has_embedded_ids = any(contains_embedded_id(val) for val in first_row)
-    first_row_has_headers = has_header_like_content(first_row)
+    first_row_has_headers = has_header_like_content(first_row, early_row_cells[0])
     first_row_is_title = is_title_or_metadata_row(first_row, most_common_length)
     
     # Check for column count mismatch (suggests first row is incomplete data, not headers)
     if len(rows) > 1:
         first_row_cols = len(first_row)
         
-        print(f"📊 Column analysis: First row={first_row_cols} cols, Expected={most_common_length} cols")
-        print(f"🔍 First row analysis: has_headers={first_row_has_headers}, is_title={first_row_is_title}, has_ids={first_row_has_ids}")
+        log(f"📊 Column analysis: First row={first_row_cols} cols, Expected={most_common_length} cols")
+        log(f"🔍 First row analysis: has_headers={first_row_has_headers}, is_title={first_row_is_title}, has_ids={first_row_has_ids}")
         
         # If first row appears to be a title/metadata row, look for real headers in subsequent rows
         if first_row_is_title or (first_row_cols < most_common_length and not first_row_has_headers):
-            print(f"🔄 First row appears to be title/metadata, searching for real headers...")
+            log(f"🔄 First row appears to be title/metadata, searching for real headers...")
             
             # Look for the actual header row in the next few rows
             for i in range(1, min(5, len(rows))):
                 candidate_row = rows[i]
                 if (len(candidate_row) >= most_common_length and 
-                    has_header_like_content(candidate_row) and
+                    has_header_like_content(candidate_row, early_row_cells[i]) and
                     not any(is_likely_id(val) for val in candidate_row)):
                     
-                    print(f"✅ Found real headers in row {i}: {candidate_row}")
+                    log(f"✅ Found real headers in row {i}: {candidate_row}")
                     return i, candidate_row
             
             # If no clear headers found, create synthetic headers based on column count
-            print(f"🔨 No clear headers found, creating synthetic headers for {most_common_length} columns")
+            log(f"🔨 No clear headers found, creating synthetic headers for {most_common_length} columns")
             synthetic_headers = []
             for col_idx in range(most_common_length):
                 if col_idx == 0:
@@ -270,26 +299,26 @@ def detect_table_structure(rows):
         
         # If first row has fewer columns than data rows AND contains embedded IDs, it's likely data
         if (first_row_cols < most_common_length and first_row_has_embedded_ids):
-            print(f"🔄 First row appears to be incomplete data (embedded IDs + column mismatch): {first_row}")
+            log(f"🔄 First row appears to be incomplete data (embedded IDs + column mismatch): {first_row}")
             return -1, first_row  # Signal transposed table
     
     # If first row has IDs but no clear headers, treat all rows as data
     if (first_row_has_ids or first_row_has_embedded_ids) and not first_row_has_headers:
-        print(f"🔄 Detected ID data in first row, treating all rows as data: {first_row}")
+        log(f"🔄 Detected ID data in first row, treating all rows as data: {first_row}")
         return -1, first_row  # Signal transposed table
     
     # First, check if early rows contain Excel UI elements
     excel_ui_rows = []
     for i in range(min(3, len(rows))):
-        if is_excel_ui_row(rows[i]):
+        if is_excel_ui_row(rows[i], early_row_cells[i]):
             excel_ui_rows.append(i)
-            print(f"🚫 Row {i} contains Excel UI elements: {rows[i][:2]}...")
+            log(f"🚫 Row {i} contains Excel UI elements: {rows[i][:2]}...")
     
     # Skip Excel UI rows and find the best header
     for i in range(min(5, len(rows))):
-        if i not in excel_ui_rows and is_header_row(rows[i]):
+        if i not in excel_ui_rows and is_header_row(rows[i], early_row_cells[i]):
             best_header_row = i
-            print(f"✅ Found proper headers in row {i}: {rows[i]}")
+            log(f"✅ Found proper headers in row {i}: {rows[i]}")
             break
         elif i not in excel_ui_rows:
             # If it's not a UI row but also not clearly headers,
@@ -297,7 +326,7 @@ def detect_table_structure(rows):
             text_cells = sum(1 for cell in rows[i] if str(cell).strip() and not str(cell).isdigit())
             if text_cells >= len(rows[i]) // 2:  # Most cells are text
                 best_header_row = i
-                print(f"📝 Using row {i} as headers (mostly text): {rows[i]}")
+                log(f"📝 Using row {i} as headers (mostly text): {rows[i]}")
                 break
     
     # If no clear headers found, check if table is transposed
@@ -312,20 +341,21 @@ def detect_table_structure(rows):
         
         # If most first column values are IDs, table might be correct
         if first_col_ids >= min(3, len(rows) - 1):
-            print("🔍 Table appears to have correct structure (IDs in first column)")
+            log("🔍 Table appears to have correct structure (IDs in first column)")
         else:
             # Check if table is transposed (headers are actually first row data)
             numeric_in_headers = sum(1 for cell in first_row if is_likely_id(cell))
             if numeric_in_headers > 0:
-                print(f"⚠️  Detected transposed table: {numeric_in_headers} IDs in header row")
+                log(f"⚠️  Detected transposed table: {numeric_in_headers} IDs in header row")
                 # For transposed tables, we need special handling
                 return -1, first_row  # Signal transposed table
     
     return best_header_row, rows[best_header_row] if best_header_row < len(rows) else []
 
-def handle_transposed_table(table, json_file, cleanup=False):
+def handle_transposed_table(table, json_file, cleanup=False, verbose=True):
     """Handle tables where first row contains data that became column headers"""
-    print("🔧 Fixing transposed table structure...")
+    log = print if verbose else quiet_print
+    log("🔧 Fixing transposed table structure...")
     
     # For transposed tables, we need to create proper structure
     # The 'rows' might be incorrectly structured
@@ -355,8 +385,8 @@ def handle_transposed_table(table, json_file, cleanup=False):
         # Include all rows as data (no header row)
         data_rows = all_rows
         
-        print(f"🔨 Created synthetic headers: {new_headers}")
-        print(f"📊 Data rows: {len(data_rows)}")
+        log(f"🔨 Created synthetic headers: {new_headers}")
+        log(f"📊 Data rows: {len(data_rows)}")
         
         # Create the corrected table structure
         corrected_table = {
@@ -374,17 +404,18 @@ def handle_transposed_table(table, json_file, cleanup=False):
         }
         
         # Now process normally
-        return process_corrected_table(corrected_table, json_file, cleanup)
+        return process_corrected_table(corrected_table, json_file, cleanup, verbose)
     
     return None
 
-def process_corrected_table(table, json_file, cleanup=False):
+def process_corrected_table(table, json_file, cleanup=False, verbose=True):
     """Process a corrected table structure"""
+    log = print if verbose else quiet_print
     rows = table['rows']
     headers = rows[0]  # First row is headers
     data_rows = rows[1:]  # Rest are data
     
-    print(f"📊 Processing corrected table with headers: {headers}")
+    log(f"📊 Processing corrected table with headers: {headers}")
     
     # Smart column detection
     id_col = None
@@ -419,13 +450,11 @@ def process_corrected_table(table, json_file, cleanup=False):
         if i not in new_order:
             new_order.append(i)
     
-    print(f"🔄 Column order: {[headers[i] for i in new_order]}")
+    log(f"🔄 Column order: {[headers[i] for i in new_order]}")
     
     # Reorder all rows
     reordered_rows = [[headers[i] for i in new_order]]  # Header row
-    for row in data_rows:
-        new_row = [row[i] if i < len(row) else '' for i in new_order]
-        reordered_rows.append(new_row)
+    reordered_rows.extend(reorder_rows(data_rows, new_order))
     
     # Create final result
     result = {
@@ -449,20 +478,20 @@ def process_corrected_table(table, json_file, cleanup=False):
         output_file = json_file.replace('.json', '_final_table.json')
     
     # Save result
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump([result], f, ensure_ascii=False, indent=2)
+    dump_json([result], output_file)
     
-    print(f"💾 Corrected table saved to: {output_file}")
+    log(f"💾 Corrected table saved to: {output_file}")
     
     # Clean up input file if requested
     if cleanup and json_file != output_file:
-        print(f"🗑️  Removing input file: {json_file}")
+        log(f"🗑️  Removing input file: {json_file}")
         os.remove(json_file)
     
     return output_file, result
 
-def detect_collapsed_table_structure(table):
+def detect_collapsed_table_structure(table, verbose=True):
     """Detect if table structure has collapsed into a single cell"""
+    log = print if verbose else quiet_print
     if not table or not table.get('rows'):
         return False
     
@@ -481,20 +510,27 @@ def detect_collapsed_table_structure(table):
             id_pattern_count = 0
             for line in lines:
                 line = line.strip()
-                if re.match(r'^\d{7,10}$', line):  # Line is just an ID number
+                if ID_LINE_PATTERN.match(line):  # Line is just an ID number
                     id_pattern_count += 1
             
             # If we have many ID patterns, this is likely a collapsed table
             if id_pattern_count >= 5:
-                print(f"🔍 Detected collapsed table structure: {id_pattern_count} ID patterns found")
+                log(f"🔍 Detected collapsed table structure: {id_pattern_count} ID patterns found")
                 return True
     
     return False
 
-def repair_collapsed_table_structure(table):
+def parse_collapsed_records(lines):
+    """Parse [ID, first name, last name] records from the stripped lines of a collapsed cell"""
+    return [[id_num, first_name or '', last_name or '']
+            for id_num, first_name, last_name in COLLAPSED_RECORD_PATTERN.findall('\n'.join(lines))]
+
+def repair_collapsed_table_structure(table, verbose=True):
     """Repair a collapsed table structure by parsing the content"""
-    print("🔧 REPAIRING COLLAPSED TABLE STRUCTURE")
-    print("=" * 50)
+    log = print if verbose else quiet_print
+    
+    log("🔧 REPAIRING COLLAPSED TABLE STRUCTURE")
+    log("=" * 50)
     
     rows = table['rows']
     repaired_rows = []
@@ -507,7 +543,7 @@ def repair_collapsed_table_structure(table):
         if not content:
             continue
             
-        print(f"\n📝 Processing row {row_idx + 1} with {len(content)} characters")
+        log(f"\n📝 Processing row {row_idx + 1} with {len(content)} characters")
         
         # Split content into lines
         lines = [line.strip() for line in content.split('\n') if line.strip()]
@@ -523,7 +559,7 @@ def repair_collapsed_table_structure(table):
                 break
         
         if header_start is not None:
-            print(f"  📋 Found headers starting at line {header_start + 1}")
+            log(f"  📋 Found headers starting at line {header_start + 1}")
             
             # Look for the header pattern: ת.ז, שם פרטי, שם משפחה
             header_lines = []
@@ -535,7 +571,7 @@ def repair_collapsed_table_structure(table):
                 if any(keyword in line.lower() for keyword in ['ת.ז', 'id', 'שם פרטי', 'שם משפחה', 'first', 'last']):
                     header_lines.append(line)
                     data_start = i + 1
-                elif re.match(r'^\d{7,10}$', line):  # Hit an ID number - data starts here
+                elif ID_LINE_PATTERN.match(line):  # Hit an ID number - data starts here
                     break
                 else:
                     data_start = i + 1
@@ -546,35 +582,14 @@ def repair_collapsed_table_structure(table):
             else:
                 headers = ['ID', 'First Name', 'Last Name']  # Default headers
             
-            print(f"  🏷️  Headers: {headers}")
+            log(f"  🏷️  Headers: {headers}")
             
             # Parse data rows
-            data_lines = lines[data_start:]
-            parsed_data = []
+            parsed_data = parse_collapsed_records(lines[data_start:])
+            for id_num, first_name, last_name in parsed_data:
+                log(f"    👤 {id_num} | {first_name} | {last_name}")
             
-            i = 0
-            while i < len(data_lines):
-                # Look for ID pattern
-                if i < len(data_lines) and re.match(r'^\d{7,10}$', data_lines[i]):
-                    id_num = data_lines[i]
-                    first_name = data_lines[i + 1] if i + 1 < len(data_lines) else ''
-                    last_name = data_lines[i + 2] if i + 2 < len(data_lines) else ''
-                    
-                    # Skip row number if present
-                    next_idx = i + 3
-                    if (next_idx < len(data_lines) and 
-                        data_lines[next_idx].isdigit() and 
-                        len(data_lines[next_idx]) <= 2):
-                        next_idx += 1  # Skip row number
-                    
-                    parsed_data.append([id_num, first_name, last_name])
-                    print(f"    👤 {id_num} | {first_name} | {last_name}")
-                    
-                    i = next_idx
-                else:
-                    i += 1
-            
-            print(f"  ✅ Parsed {len(parsed_data)} data rows")
+            log(f"  ✅ Parsed {len(parsed_data)} data rows")
             
             # Add headers and data to repaired rows
             if not repaired_rows:  # First time, add headers
@@ -583,33 +598,13 @@ def repair_collapsed_table_structure(table):
             repaired_rows.extend(parsed_data)
         
         else:
-            print(f"  ⚠️  No clear headers found, treating as data continuation")
+            log(f"  ⚠️  No clear headers found, treating as data continuation")
             
             # Try to parse as continuation of data
-            lines = [line.strip() for line in content.split('\n') if line.strip()]
-            
-            parsed_data = []
-            i = 0
-            while i < len(lines):
-                if i < len(lines) and re.match(r'^\d{7,10}$', lines[i]):
-                    id_num = lines[i]
-                    first_name = lines[i + 1] if i + 1 < len(lines) else ''
-                    last_name = lines[i + 2] if i + 2 < len(lines) else ''
-                    
-                    # Skip row number if present
-                    next_idx = i + 3
-                    if (next_idx < len(lines) and 
-                        lines[next_idx].isdigit() and 
-                        len(lines[next_idx]) <= 2):
-                        next_idx += 1
-                    
-                    parsed_data.append([id_num, first_name, last_name])
-                    i = next_idx
-                else:
-                    i += 1
+            parsed_data = parse_collapsed_records(lines)
             
             repaired_rows.extend(parsed_data)
-            print(f"  ✅ Parsed {len(parsed_data)} additional data rows")
+            log(f"  ✅ Parsed {len(parsed_data)} additional data rows")
     
     if repaired_rows:
         # Create the repaired table structure
@@ -627,48 +622,51 @@ def repair_collapsed_table_structure(table):
             }
         }
         
-        print(f"\n✅ REPAIR COMPLETE:")
-        print(f"  Original: {table.get('row_count', 0)} rows x {table.get('column_count', 0)} cols")
-        print(f"  Repaired: {len(repaired_rows)} rows x 3 cols")
-        print(f"  Data rows: {len(repaired_rows) - 1 if len(repaired_rows) > 1 else 0}")
+        log(f"\n✅ REPAIR COMPLETE:")
+        log(f"  Original: {table.get('row_count', 0)} rows x {table.get('column_count', 0)} cols")
+        log(f"  Repaired: {len(repaired_rows)} rows x 3 cols")
+        log(f"  Data rows: {len(repaired_rows) - 1 if len(repaired_rows) > 1 else 0}")
         
         return repaired_table
     
     return None
 
-def extract_final_table(json_file, cleanup=False):
-    """Extract and reorder table, optionally cleaning up the input file"""
+def extract_final_table(json_file, cleanup=False, verbose=True):
+    """Extract and reorder table, optionally cleaning up the input file
+    
+    verbose=False suppresses the progress report, for callers that process many files
+    """
+    log = print if verbose else quiet_print
     
     # Read the input file
-    with open(json_file, 'r', encoding='utf-8') as f:
-        tables = json.load(f)
+    tables = load_json(json_file)
     
     if not tables:
-        print("❌ No tables found in JSON file")
+        log("❌ No tables found in JSON file")
         return None
     
     table = tables[0]  # Use first table
     if not table['rows']:
-        print("❌ No rows found in table")
+        log("❌ No rows found in table")
         return None
     
     # Check if table structure has collapsed and needs repair
-    if detect_collapsed_table_structure(table):
-        repaired_table = repair_collapsed_table_structure(table)
+    if detect_collapsed_table_structure(table, verbose):
+        repaired_table = repair_collapsed_table_structure(table, verbose)
         if repaired_table:
             table = repaired_table  # Use the repaired table
         else:
-            print("⚠️  Failed to repair collapsed table structure")
+            log("⚠️  Failed to repair collapsed table structure")
     
     # Analyze table structure
-    header_row_idx, headers = detect_table_structure(table['rows'])
+    header_row_idx, headers = detect_table_structure(table['rows'], verbose)
     
     if header_row_idx == -1:
-        print("🔄 Handling transposed table - converting data back to proper format")
+        log("🔄 Handling transposed table - converting data back to proper format")
         # Handle transposed table where first row is actually data
-        return handle_transposed_table(table, json_file, cleanup)
+        return handle_transposed_table(table, json_file, cleanup, verbose)
     
-    print(f"📊 Using row {header_row_idx} as headers: {headers}")
+    log(f"📊 Using row {header_row_idx} as headers: {headers}")
     
     # Smart column detection
     id_col = None
@@ -684,7 +682,7 @@ def extract_final_table(json_file, cleanup=False):
         elif 'שם משפחה' in h or 'last' in h or 'surname' in h:
             lname_col = i
     
-    print(f"🔍 Found columns - ID: {id_col}, First Name: {fname_col}, Last Name: {lname_col}")
+    log(f"🔍 Found columns - ID: {id_col}, First Name: {fname_col}, Last Name: {lname_col}")
     
     # Create new column order: ID, First Name, Last Name, Others
     new_order = []
@@ -700,13 +698,10 @@ def extract_final_table(json_file, cleanup=False):
         if i not in new_order:
             new_order.append(i)
     
-    print(f"🔄 New column order: {[headers[i] for i in new_order]}")
+    log(f"🔄 New column order: {[headers[i] for i in new_order]}")
     
     # Reorder all rows
-    reordered_rows = []
-    for row in table['rows']:
-        new_row = [row[i] if i < len(row) else '' for i in new_order]
-        reordered_rows.append(new_row)
+    reordered_rows = reorder_rows(table['rows'], new_order)
     
     # Create final result
     result = {
@@ -729,14 +724,13 @@ def extract_final_table(json_file, cleanup=False):
         output_file = json_file.replace('.json', '_final_table.json')
     
     # Save result
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump([result], f, ensure_ascii=False, indent=2)
+    dump_json([result], output_file)
     
-    print(f"💾 Final table saved to: {output_file}")
+    log(f"💾 Final table saved to: {output_file}")
     
     # Clean up input file if requested
     if cleanup and json_file != output_file:
-        print(f"🗑️  Removing input file: {json_file}")
+        log(f"🗑️  Removing input file: {json_file}")
         os.remove(json_file)
     
     return output_file, result
@@ -157,10 +157,11 @@ def verify_improvements():
         print(f"   - Successful extractions: {original_success_count}")
         print(f"   - Errors: {original_error_count}")
     
-    # Count JSON files
-    json_files = len([f for f in os.listdir('json_result') if f.endswith('_tables.json')])
-    final_files = len([f for f in os.listdir('json_result') if f.endswith('_final_table.json')])
-    recovered_files = len([f for f in os.listdir('json_result') if '_recovered_table' in f])
+    # Count JSON files (one directory listing, counted without building lists)
+    json_result_files = os.listdir('json_result')
+    json_files = sum(1 for f in json_result_files if f.endswith('_tables.json'))
+    final_files = sum(1 for f in json_result_files if f.endswith('_final_table.json'))
+    recovered_files = sum(1 for f in json_result_files if '_recovered_table' in f)
     
     print(f"\n📁 File counts:")
     print(f"   - Original table JSON files: {json_files}")
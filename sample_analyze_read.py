@@ -15,6 +15,7 @@ import warnings
 import hashlib
 from pathlib import Path
 import os
+import shutil
 
 # Suppress urllib3 SSL warnings for LibreSSL compatibility
 warnings.filterwarnings("ignore", message=".*urllib3 v2 only supports OpenSSL.*")
@@ -39,16 +40,19 @@ def create_result_folders():
 
 def get_file_hash(file_path):
     """Generate a hash for the file to create unique identifier"""
-    hasher = hashlib.md5()
     with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096), b""):
+        if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+            return hashlib.file_digest(f, 'md5').hexdigest()
+        hasher = hashlib.md5()
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
             hasher.update(chunk)
-    return hasher.hexdigest()
+        return hasher.hexdigest()
 
-def get_cached_results(file_path, json_folder, txt_folder):
+def get_cached_results(file_path, json_folder, txt_folder, file_hash=None, verbose=True):
     """Check if we already have cached results for this file"""
     base_name = Path(file_path).stem
-    file_hash = get_file_hash(file_path)
+    if file_hash is None:
+        file_hash = get_file_hash(file_path)
     
     # Look for existing files with this hash
     json_pattern = f"{base_name}-{file_hash[:8]}_tables.json"
@@ -58,7 +62,8 @@ def get_cached_results(file_path, json_folder, txt_folder):
     txt_file = txt_folder / txt_pattern
     
     if json_file.exists() and txt_file.exists():
-        print(f"Found cached results for {base_name} (hash: {file_hash[:8]})")
+        if verbose:
+            print(f"Found cached results for {base_name} (hash: {file_hash[:8]})")
         return json_file, txt_file, file_hash
     
     return None, None, file_hash
@@ -69,7 +74,7 @@ def format_bounding_box(bounding_box):
     reshaped_bounding_box = np.array(bounding_box).reshape(-1, 2)
     return ", ".join(["[{}, {}]".format(x, y) for x, y in reshaped_bounding_box])
 
-def analyze_read(file_path=None, output_file=None, save_tables_json=False):
+def analyze_read(file_path=None, output_file=None, save_tables_json=False, verbose=True, timeout=None):
     document_intelligence_client  = DocumentIntelligenceClient(
         endpoint=endpoint, credential=AzureKeyCredential(key)
     )
@@ -86,13 +91,21 @@ def analyze_read(file_path=None, output_file=None, save_tables_json=False):
         poller = document_intelligence_client.begin_analyze_document(
             "prebuilt-layout", AnalyzeDocumentRequest(url_source=formUrl)
         )
+    # timeout bounds only this wait: the upload in begin_analyze_document above is
+    # not limited, and the poller has no cancel, so after a TimeoutError it keeps
+    # polling the service in the background until the analysis finishes
+    if timeout is not None:
+        poller.wait(timeout)
+        if not poller.done():
+            raise TimeoutError(f"Analysis did not complete within {timeout} seconds")
     result = poller.result()
 
     # Prepare output content
     output_lines = []
     
     def add_output(text):
-        print(text)
+        if verbose:
+            print(text)
         output_lines.append(text)
     
     add_output(f"Document contains content: {result.content}")
@@ -199,95 +212,109 @@ def analyze_read(file_path=None, output_file=None, save_tables_json=False):
     if output_file:
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write('\n'.join(output_lines))
-        print(f"\nResults saved to: {output_file}")
+        if verbose:
+            print(f"\nResults saved to: {output_file}")
     
     # Save tables as JSON if requested
     if save_tables_json and tables_data:
         json_filename = output_file.replace('_ocr_results.txt', '_tables.json') if output_file else 'extracted_tables.json'
         with open(json_filename, 'w', encoding='utf-8') as f:
             json.dump(tables_data, f, ensure_ascii=False, indent=2)
-        print(f"Tables saved as JSON to: {json_filename}")
-    elif save_tables_json and not tables_data:
+        if verbose:
+            print(f"Tables saved as JSON to: {json_filename}")
+    elif save_tables_json and not tables_data and verbose:
         print("No tables found to save as JSON.")
 
 
+def run(file_path, save_json=False, verbose=True, timeout=None, file_hash=None):
+    """Analyze a local file, reusing cached results when available.
+
+    Leaves {base_name}_tables.json and {base_name}_ocr_results.txt in the
+    working directory, exactly as running this script on the file does.
+    Callers that already hashed the file can pass file_hash to skip rehashing.
+    verbose=False also suppresses the progress messages printed here.
+    
+    timeout only bounds the wait for the analysis result, not the upload, and
+    the analysis is not cancelled when it expires (see analyze_read).
+    """
+    log = print if verbose else (lambda text: None)
+    
+    # Create result folders
+    json_folder, txt_folder = create_result_folders()
+    
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    
+    # Check for cached results first
+    cached_json, cached_txt, file_hash = get_cached_results(file_path, json_folder, txt_folder, file_hash, verbose)
+    
+    if cached_json and cached_txt:
+        log(f"\n✅ Using cached results for {base_name}")
+        log(f"   JSON: {cached_json}")
+        log(f"   TXT: {cached_txt}")
+        
+        # Copy cached files to current directory for backward compatibility
+        current_json = f"{base_name}_tables.json"
+        current_txt = f"{base_name}_ocr_results.txt"
+        
+        shutil.copy2(cached_json, current_json)
+        shutil.copy2(cached_txt, current_txt)
+        
+        log(f"   Copied to: {current_json}")
+        log(f"   Copied to: {current_txt}")
+    else:
+        log(f"\n🔄 Processing new file: {base_name}")
+        
+        # Generate output filenames with hash for uniqueness
+        hash_suffix = file_hash[:8]
+        output_file = f"{base_name}_ocr_results.txt"
+        
+        log(f"Analyzing local file: {file_path}")
+        log(f"File hash: {file_hash[:8]}")
+        log(f"Results will be saved to organized folders")
+        
+        if save_json:
+            log(f"Tables will be saved as JSON")
+        
+        # Run OCR analysis
+        analyze_read(file_path, output_file, save_json, verbose=verbose, timeout=timeout)
+        
+        # Move results to organized folders
+        json_file = f"{base_name}_tables.json"
+        txt_file = f"{base_name}_ocr_results.txt"
+        
+        # Create unique filenames with hash
+        cached_json_name = f"{base_name}-{hash_suffix}_tables.json"
+        cached_txt_name = f"{base_name}-{hash_suffix}_ocr_results.txt"
+        
+        # Move files to result folders
+        if os.path.exists(json_file):
+            shutil.move(json_file, json_folder / cached_json_name)
+            log(f"📁 Moved JSON to: json_result/{cached_json_name}")
+            
+            # Create a copy in current directory for backward compatibility
+            shutil.copy2(json_folder / cached_json_name, json_file)
+        
+        if os.path.exists(txt_file):
+            shutil.move(txt_file, txt_folder / cached_txt_name)
+            log(f"📁 Moved TXT to: txt_result/{cached_txt_name}")
+            
+            # Create a copy in current directory for backward compatibility
+            shutil.copy2(txt_folder / cached_txt_name, txt_file)
+        
+        log(f"\n💾 Results cached for future use!")
+
+
 if __name__ == "__main__":
     import sys
-    import os
-    import shutil
     
     # Check for --json flag
     save_json = '--json' in sys.argv
     if save_json:
         sys.argv.remove('--json')
     
-    # Create result folders
-    json_folder, txt_folder = create_result_folders()
-    
     if len(sys.argv) > 1:
         # Run with local PDF file
-        pdf_file_path = sys.argv[1]
-        base_name = os.path.splitext(os.path.basename(pdf_file_path))[0]
-        
-        # Check for cached results first
-        cached_json, cached_txt, file_hash = get_cached_results(pdf_file_path, json_folder, txt_folder)
-        
-        if cached_json and cached_txt:
-            print(f"\n✅ Using cached results for {base_name}")
-            print(f"   JSON: {cached_json}")
-            print(f"   TXT: {cached_txt}")
-            
-            # Copy cached files to current directory for backward compatibility
-            current_json = f"{base_name}_tables.json"
-            current_txt = f"{base_name}_ocr_results.txt"
-            
-            shutil.copy2(cached_json, current_json)
-            shutil.copy2(cached_txt, current_txt)
-            
-            print(f"   Copied to: {current_json}")
-            print(f"   Copied to: {current_txt}")
-        else:
-            print(f"\n🔄 Processing new file: {base_name}")
-            
-            # Generate output filenames with hash for uniqueness
-            hash_suffix = file_hash[:8]
-            output_file = f"{base_name}_ocr_results.txt"
-            
-            print(f"Analyzing local file: {pdf_file_path}")
-            print(f"File hash: {file_hash[:8]}")
-            print(f"Results will be saved to organized folders")
-            
-            if save_json:
-                print(f"Tables will be saved as JSON")
-            
-            # Run OCR analysis
-            analyze_read(pdf_file_path, output_file, save_json)
-            
-            # Move results to organized folders
-            json_file = f"{base_name}_tables.json"
-            txt_file = f"{base_name}_ocr_results.txt"
-            
-            # Create unique filenames with hash
-            cached_json_name = f"{base_name}-{hash_suffix}_tables.json"
-            cached_txt_name = f"{base_name}-{hash_suffix}_ocr_results.txt"
-            
-            # Move files to result folders
-            if os.path.exists(json_file):
-                shutil.move(json_file, json_folder / cached_json_name)
-                print(f"📁 Moved JSON to: json_result/{cached_json_name}")
-                
-                # Create a copy in current directory for backward compatibility
-                shutil.copy2(json_folder / cached_json_name, json_file)
-            
-            if os.path.exists(txt_file):
-                shutil.move(txt_file, txt_folder / cached_txt_name)
-                print(f"📁 Moved TXT to: txt_result/{cached_txt_name}")
-                
-                # Create a copy in current directory for backward compatibility
-                shutil.copy2(txt_folder / cached_txt_name, txt_file)
-            
-            print(f"\n💾 Results cached for future use!")
-            
+        run(sys.argv[1], save_json)
     else:
         # Run with sample URL document
         print("No file specified, using sample document from URL")
@@ -124,10 +124,11 @@ def main():
     # Get files that were cached as having no table data
     cached_no_table_files = find_cached_no_table_files()
     
-    # Combine and deduplicate
-    all_problem_files = set(error_files)
-    for file, _ in cached_no_table_files:
-        all_problem_files.add(file)
+    # Combine and deduplicate, keeping discovery order so "first 10" and the
+    # numbered list below are stable between runs
+    all_problem_files = list(dict.fromkeys(
+        error_files + [file for file, _ in cached_no_table_files]
+    ))
     
     print(f"\n📝 Total unique files to verify: {len(all_problem_files)}")
     
@@ -143,12 +144,12 @@ def main():
     files_to_verify = []
     
     if choice == "1":
-        files_to_verify = list(all_problem_files)
+        files_to_verify = all_problem_files
     elif choice == "2":
-        files_to_verify = list(all_problem_files)[:10]
+        files_to_verify = all_problem_files[:10]
     elif choice == "3":
         print("\nEnter file numbers to verify (comma-separated):")
-        file_list = list(all_problem_files)
+        file_list = all_problem_files
         for i, file in enumerate(file_list, 1):
             print(f"  {i}. {file}")
         